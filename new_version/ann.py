@@ -0,0 +1,203 @@
+"""Approximate nearest neighbors over dense movie embeddings.
+
+TF-IDF rows are projected to EMBEDDING_DIM dimensions with a truncated SVD
+and L2-normalized, so the dot product of two embeddings approximates the
+cosine similarity of the original rows. IVFIndex groups the embeddings by
+their nearest k-means centroid (an inverted file); a query only scores the
+movies in the ``n_probe`` lists whose centroids are closest to it.
+
+Two knobs trade recall for latency: ``n_probe`` (more lists scanned) and
+``rerank`` (how many candidates, as a multiple of the results asked for,
+are re-scored with the exact TF-IDF cosine before the final cut).
+"""
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+
+from indexes import top_k
+
+EMBEDDING_DIM = 128
+N_PROBE = 8
+RERANK = 10
+# k-means is fitted on a sample of at most this many embeddings
+KMEANS_SAMPLE = 50000
+# Queries scored together by search_many (bounds the candidate scratch)
+QUERY_BLOCK = 2048
+# Smaller batches are cheaper to answer one query at a time
+MIN_BATCH = 32
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def fit_projection(matrix, dim=EMBEDDING_DIM, seed=0):
+    """Truncated SVD components (dim x features) of the TF-IDF rows"""
+    dim = max(1, min(dim, min(matrix.shape) - 1))
+    svd = TruncatedSVD(dim, random_state=seed).fit(matrix)
+    return svd.components_.astype(np.float32)
+
+
+def embed(matrix, components):
+    """Unit-length float32 embeddings of TF-IDF rows"""
+    return normalize(np.asarray(matrix @ components.T))
+
+
+def rerank(matrix, rows, candidates, k):
+    """Re-score each row's candidates with the exact cosine; best k (ids, scores) per row"""
+    results = []
+    for row, found in zip(rows, candidates):
+        scores = np.asarray(matrix[found] @ matrix[row].toarray().ravel(), dtype=np.float32)
+        best = top_k(scores, k)
+        results.append((found[best], scores[best]))
+    return results
+
+
+class IVFIndex:
+    """Embeddings stored contiguously per k-means list (CSR-style offsets).
+
+    ``ids`` maps each stored vector back to its row id and ``positions``
+    maps a row id to its stored vector; ``components`` projects new
+    TF-IDF rows into the embedding space.
+    """
+
+    ARRAYS = ('components', 'centroids', 'offsets', 'ids', 'vectors', 'positions')
+
+    def __init__(self, components, centroids, offsets, ids, vectors, positions,
+                 n_probe=N_PROBE, rerank=RERANK):
+        # np.asarray: slicing a plain ndarray view is much cheaper than a memmap
+        self.components = np.asarray(components)
+        self.centroids = np.asarray(centroids)
+        self.offsets = np.asarray(offsets)
+        self.ids = np.asarray(ids)
+        self.vectors = np.asarray(vectors)
+        self.positions = np.asarray(positions)
+        self.n_probe = n_probe
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, matrix, dim=EMBEDDING_DIM, n_lists=None, n_probe=N_PROBE, rerank=RERANK, seed=0):
+        """Project the TF-IDF matrix and partition it into n_lists (default 2 * sqrt(N)) lists"""
+        components = fit_projection(matrix, dim, seed)
+        vectors = embed(matrix, components)
+        n = len(vectors)
+        n_lists = max(1, min(n, n_lists or int(round(2 * np.sqrt(n)))))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, KMEANS_SAMPLE, replace=False)] if n > KMEANS_SAMPLE else vectors
+        kmeans = MiniBatchKMeans(n_lists, batch_size=4096, n_init=1, random_state=seed).fit(sample)
+        centroids = normalize(kmeans.cluster_centers_)
+
+        assignment = np.empty(n, dtype=np.int64)
+        for start in range(0, n, QUERY_BLOCK):
+            assignment[start:start + QUERY_BLOCK] = np.argmax(vectors[start:start + QUERY_BLOCK] @ centroids.T, axis=1)
+        ids = np.argsort(assignment, kind='stable').astype(np.int32)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=offsets[1:])
+        positions = np.empty(n, dtype=np.int32)
+        positions[ids] = np.arange(n, dtype=np.int32)
+        return cls(components, centroids, offsets, ids, vectors[ids], positions, n_probe, rerank)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def added(self, matrix):
+        """A copy with new TF-IDF rows appended (their row ids follow the existing ones)"""
+        vectors = embed(matrix, self.components)
+        lists = np.argmax(vectors @ self.centroids.T, axis=1)
+        # Insert each new vector at the end of its list
+        at = self.offsets[lists + 1]
+        order = np.argsort(at, kind='stable')
+        new_ids = np.arange(len(self), len(self) + len(vectors), dtype=np.int32)
+        ids = np.insert(self.ids, at[order], new_ids[order])
+        offsets = self.offsets + np.concatenate(([0], np.cumsum(np.bincount(lists, minlength=len(self.centroids)))))
+        positions = np.empty(len(ids), dtype=np.int32)
+        positions[ids] = np.arange(len(ids), dtype=np.int32)
+        return IVFIndex(self.components, self.centroids, offsets, ids,
+                        np.insert(self.vectors, at[order], vectors[order], axis=0), positions,
+                        self.n_probe, self.rerank)
+
+    def vector(self, row):
+        return self.vectors[self.positions[row]]
+
+    def probe_lists(self, query, k, n_probe):
+        """The n_probe closest lists, widened until they hold at least k movies"""
+        order = np.argsort(-(self.centroids @ query), kind='stable')
+        sizes = np.cumsum(np.diff(self.offsets)[order])
+        needed = int(np.searchsorted(sizes, k)) + 1
+        return order[:max(n_probe, needed)]
+
+    def search(self, query, k, exclude=None, n_probe=None):
+        """Row ids of the (approximately) k nearest embeddings, best first"""
+        lists = self.probe_lists(query, k + (exclude is not None), n_probe or self.n_probe)
+        ids = np.concatenate([self.ids[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        vectors = np.concatenate([self.vectors[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        scores = vectors @ query
+        if exclude is not None:
+            scores[ids == exclude] = -np.inf
+        best = top_k(scores, k)
+        return ids[best[np.isfinite(scores[best])]]
+
+    def search_many(self, queries, k, exclude=None, n_probe=None):
+        """search for each query row; a list probed by several queries is scored once for all of them"""
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        if len(queries) < MIN_BATCH:
+            return [self.search(query, k, None if exclude is None else exclude[i], n_probe)
+                    for i, query in enumerate(queries)]
+        results = []
+        for start in range(0, len(queries), QUERY_BLOCK):
+            block = queries[start:start + QUERY_BLOCK]
+            skip = None if exclude is None else np.asarray(exclude[start:start + QUERY_BLOCK])
+            results.extend(self._search_block(block, k, skip, n_probe))
+        # Queries whose probed lists held too few movies widen their probe
+        for i, found in enumerate(results):
+            if len(found) < min(k, len(self) - (exclude is not None)):
+                results[i] = self.search(queries[i], k, None if exclude is None else exclude[i], n_probe)
+        return results
+
+    def _search_block(self, queries, k, exclude, n_probe):
+        centroid_scores = queries @ self.centroids.T
+        n_lists = centroid_scores.shape[1]
+        if n_probe < n_lists:
+            probes = np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.tile(np.arange(n_lists), (len(queries), 1))
+        # (query, list) pairs grouped by list
+        query_rows = np.repeat(np.arange(len(queries)), probes.shape[1])
+        lists = probes.ravel()
+        order = np.argsort(lists, kind='stable')
+        query_rows, lists = query_rows[order], lists[order]
+        starts = np.flatnonzero(np.r_[True, lists[1:] != lists[:-1]])
+        stops = np.r_[starts[1:], len(lists)]
+
+        hit_rows, hit_ids, hit_scores = [], [], []
+        for start, stop in zip(starts, stops):
+            lo, hi = self.offsets[lists[start]], self.offsets[lists[start] + 1]
+            if lo == hi:
+                continue
+            rows = query_rows[start:stop]
+            ids = self.ids[lo:hi]
+            scores = queries[rows] @ self.vectors[lo:hi].T
+            if exclude is not None:
+                scores[ids[None, :] == exclude[rows][:, None]] = -np.inf
+            keep = min(k, hi - lo)
+            if keep < hi - lo:
+                top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            else:
+                top = np.broadcast_to(np.arange(hi - lo), scores.shape)
+            hit_rows.append(np.repeat(rows, keep))
+            hit_ids.append(ids[top].ravel())
+            hit_scores.append(np.take_along_axis(scores, top, axis=1).ravel())
+
+        if not hit_rows:
+            return [self.ids[:0]] * len(queries)
+        rows, ids, scores = np.concatenate(hit_rows), np.concatenate(hit_ids), np.concatenate(hit_scores)
+        finite = np.isfinite(scores)
+        rows, ids, scores = rows[finite], ids[finite], scores[finite]
+        order = np.lexsort((ids, -scores, rows))
+        rows, ids = rows[order], ids[order]
+        group_starts = np.searchsorted(rows, np.arange(len(queries)))
+        group_stops = np.searchsorted(rows, np.arange(len(queries)), side='right')
+        return [ids[a:min(b, a + k)] for a, b in zip(group_starts, group_stops)]
@@ -1,7 +1,12 @@
-from flask import Flask, render_template, request, jsonify
-from recommender import MovieRecommender
-from nlp_model import CompleteMovieExpert
+from flask import Flask, Response, g, render_template, request, jsonify
+from loader import ModelLoader
+from result_cache import open_cache
+from sessions import open_store, SESSION_TTL
+import metrics
 import os
+import re
+import time
+import uuid
 
 app = Flask(__name__)
 
@@ -11,34 +16,143 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Build file paths dynamically
 movies_path = os.path.join(BASE_DIR, 'data', 'movies.csv')
 credits_path = os.path.join(BASE_DIR, 'data', 'credits.csv')
+# Precomputed model; rebuilt automatically when the CSVs change
+model_path = os.environ.get('MODEL_ARTIFACT', os.path.join(BASE_DIR, 'data', 'model'))
+# 'memory' (per worker) or 'sqlite:<path>' to share conversations between workers
+session_store = os.environ.get('SESSION_STORE', 'memory')
+# Cache of similar/person/year/search results: 'memory' (per worker),
+# 'sqlite:<path>' to share hits between workers, or 'none'
+result_cache = os.environ.get('RESULT_CACHE', 'memory')
+# 'exact' or 'ann' (approximate neighbors from an IVF index, for large catalogs)
+similarity_engine = os.environ.get('SIMILARITY_ENGINE', 'exact')
 
-try:
-    recommender = MovieRecommender(movies_path, credits_path)
-    nlp_processor = CompleteMovieExpert(recommender)
+SESSION_COOKIE = 'chat_session'
+# Most messages accepted by one /chat/batch request
+MAX_BATCH = 1000
+SESSION_ID = re.compile(r'[0-9a-f]{32}')
+# Seconds clients are told to wait while the model is still loading
+RETRY_AFTER = 5
+
+def load_model():
+    """Load the model and the chat layer; runs in the loader thread"""
+    # Imported here so pandas and scikit-learn stay off the startup path
+    from recommender import MovieRecommender
+    from nlp_model import CompleteMovieExpert
+    recommender = MovieRecommender.load_or_build(movies_path, credits_path, model_path, shared=True,
+                                                engine=similarity_engine)
+    recommender.result_cache = open_cache(result_cache)
+    nlp_processor = CompleteMovieExpert(recommender, open_store(session_store))
     print("Complete Movie Expert initialized successfully!")
-except Exception as e:
-    print(f"Error initializing: {e}")
-    recommender = None
-    nlp_processor = None
+    return nlp_processor
+
+# Started by the gunicorn post_worker_init hook, or else by the first request
+loader = ModelLoader(load_model)
+app.extensions['model_loader'] = loader
+
+def unavailable(body):
+    """503 for requests that need the model before it is loaded"""
+    if loader.state == 'failed':
+        return jsonify(body('System initialization failed. Please check data files.')), 503
+    response = jsonify(body('The movie expert is still starting up. Please try again in a few seconds.'))
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    return response, 503
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    loader.start()
+
+@app.after_request
+def record_latency(response):
+    if 'request_start' in g:
+        metrics.HTTP_SECONDS.observe(request.url_rule.rule if request.url_rule else 'unmatched',
+                                     str(response.status_code),
+                                     value=time.perf_counter() - g.request_start)
+    return response
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: 200 once the model is loaded (with its load timings), 503 before"""
+    return jsonify(loader.status()), 200 if loader.ready else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def session_id():
+    """The caller's session id from the cookie (or JSON body); a new one if missing"""
+    sid = request.cookies.get(SESSION_COOKIE) or (request.get_json(silent=True) or {}).get('session_id')
+    if isinstance(sid, str) and SESSION_ID.fullmatch(sid):
+        return sid
+    return uuid.uuid4().hex
+
 @app.route('/chat', methods=['POST'])
 def chat():
+    nlp_processor = loader.value
     if not nlp_processor:
-        return jsonify({'response': 'System initialization failed. Please check data files.'})
+        return unavailable(lambda message: {'response': message})
 
     user_message = request.json.get('message', '')
 
     if not user_message.strip():
         return jsonify({'response': 'Please enter a message.'})
 
+    sid = session_id()
+
     # Process with Complete NLP
-    response = nlp_processor.process_query(user_message)
+    response = jsonify({'response': nlp_processor.process_query(user_message, sid)})
+    # Re-sent every time so the cookie expires with the server-side session
+    response.set_cookie(SESSION_COOKIE, sid, max_age=SESSION_TTL, httponly=True, samesite='Lax')
+    return response
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    nlp_processor = loader.value
+    if not nlp_processor:
+        return unavailable(lambda message: {'error': message})
+
+    messages = (request.get_json(silent=True) or {}).get('messages')
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        return jsonify({'error': "Expected JSON like {'messages': ['...', ...]}."}), 400
+    if len(messages) > MAX_BATCH:
+        return jsonify({'error': f'At most {MAX_BATCH} messages per batch.'}), 413
+
+    sid = session_id()
+    asked = [m for m in messages if m.strip()]
+    answers = iter(nlp_processor.process_queries(asked, sid))
+    responses = [next(answers) if m.strip() else 'Please enter a message.' for m in messages]
+
+    response = jsonify({'responses': responses})
+    response.set_cookie(SESSION_COOKIE, sid, max_age=SESSION_TTL, httponly=True, samesite='Lax')
+    return response
+
+@app.route('/chat/click', methods=['POST'])
+def chat_click():
+    """Record a movie the user clicked, so later lists lean toward it"""
+    nlp_processor = loader.value
+    if not nlp_processor:
+        return unavailable(lambda message: {'error': message})
+
+    title = (request.get_json(silent=True) or {}).get('title')
+    if not isinstance(title, str) or not title.strip():
+        return jsonify({'error': "Expected JSON like {'title': '...'}."}), 400
+
+    sid = session_id()
+    if not nlp_processor.remember_title(sid, title):
+        return jsonify({'error': f"Movie '{title}' not found."}), 404
 
-    return jsonify({'response': response})
+    response = jsonify({'recorded': title})
+    response.set_cookie(SESSION_COOKIE, sid, max_age=SESSION_TTL, httponly=True, samesite='Lax')
+    return response
 
 
 # T: Render-compatible run
@@ -46,4 +160,5 @@ def chat():
 if __name__ == '__main__':
 
     port = int(os.environ.get("PORT", 5000))
+    loader.start()
     app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,433 @@
+"""On-disk model artifact for MovieRecommender.
+
+An artifact is a directory of plain ``.npy`` files plus a ``manifest.json``.
+Numeric columns and sparse matrices are stored as raw arrays so they can be
+memory-mapped on load; string columns are stored as one UTF-8 byte buffer
+with an offsets array, and categorical columns as their codes plus such a
+buffer of categories. The manifest records the checksums of the CSV files
+the model was built from, so a changed dataset invalidates the artifact.
+
+Build one ahead of time with::
+
+    python artifact.py data/movies.csv data/credits.csv data/model [--streaming] [--engine ann]
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from ann import IVFIndex
+from fulltext import TextIndex
+from indexes import PostingIndex, TokenLists
+
+FORMAT_VERSION = 8
+MANIFEST = 'manifest.json'
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_sources(paths):
+    """Fingerprint the input files (size, mtime and checksum)"""
+    sources = {}
+    for name, path in paths.items():
+        stat = os.stat(path)
+        sources[name] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_checksum(path),
+        }
+    return sources
+
+
+def read_manifest(path):
+    """Return the artifact manifest, or None if there is no usable artifact"""
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def is_fresh(path, paths, params=None):
+    """Check that the artifact at ``path`` was built from ``paths`` (and with ``params``).
+
+    Size and mtime are compared first; the checksum is only recomputed when
+    they differ, so an untouched dataset costs two ``stat`` calls.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        return False
+    recorded_params = manifest.get('params', {})
+    if any(recorded_params.get(name) != value for name, value in (params or {}).items()):
+        return False
+    recorded = manifest.get('sources', {})
+    if set(recorded) != set(paths):
+        return False
+    for name, source_path in paths.items():
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return False
+        entry = recorded[name]
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns != entry['mtime_ns'] and file_checksum(source_path) != entry['sha256']:
+            return False
+    return True
+
+
+@contextmanager
+def build_lock(path):
+    """Hold an exclusive lock on ``path``'s lock file, so that processes
+    starting together build a stale artifact once instead of each on their own"""
+    if fcntl is None:
+        yield
+        return
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    with open(os.path.abspath(path) + '.lock', 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _save_array(directory, name, array):
+    np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _load_array(directory, name, mmap):
+    return np.load(os.path.join(directory, name + '.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+def encode_strings(values):
+    """Pack a sequence of optional strings into (offsets, utf8 buffer, null mask)"""
+    nulls = np.array([not isinstance(v, str) for v in values], dtype=bool)
+    encoded = [v.encode('utf-8') if isinstance(v, str) else b'' for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, buffer, nulls
+
+
+def decode_strings(offsets, buffer, nulls):
+    """Inverse of encode_strings; returns a list with None for nulls"""
+    data = buffer.tobytes()
+    bounds = offsets.tolist()
+    return [
+        None if null else data[start:stop].decode('utf-8')
+        for start, stop, null in zip(bounds[:-1], bounds[1:], nulls.tolist())
+    ]
+
+
+class StringTable:
+    """Read-only string column that stays in its (memory-mapped) buffer.
+
+    Strings are only decoded for the rows that are asked for, so every
+    process mapping the same artifact shares one copy of the text.
+    """
+
+    def __init__(self, offsets, buffer, nulls):
+        self.offsets = offsets
+        self.buffer = buffer
+        self.nulls = nulls
+        self.view = memoryview(buffer)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if self.nulls[row]:
+            return None
+        start, stop = self.offsets[row:row + 2].tolist()
+        return str(self.view[start:stop], 'utf-8')
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def contains(self, text, case=False):
+        """Boolean mask of rows containing ``text`` (literal match)"""
+        pattern = re.compile(re.escape(text.encode('utf-8')), 0 if case else re.IGNORECASE)
+        view = self.view
+        mask = np.zeros(len(self), dtype=bool)
+        position, end = 0, len(view)
+        while position < end:
+            match = pattern.search(view, position)
+            if match is None:
+                break
+            row = int(np.searchsorted(self.offsets, match.start(), side='right')) - 1
+            row_end = self.offsets[row + 1]
+            if match.end() <= row_end:
+                mask[row] = True
+            # One hit per row is enough; resume at the next row
+            position = max(row_end, match.start() + 1)
+        return mask & ~self.nulls
+
+
+def save_strings(directory, name, values):
+    offsets, buffer, nulls = encode_strings(values)
+    _save_array(directory, name + '.offsets', offsets)
+    _save_array(directory, name + '.utf8', buffer)
+    _save_array(directory, name + '.null', nulls)
+
+
+def load_strings(directory, name, mmap):
+    return StringTable(
+        _load_array(directory, name + '.offsets', mmap),
+        _load_array(directory, name + '.utf8', mmap),
+        _load_array(directory, name + '.null', mmap),
+    )
+
+
+def save_frame(directory, frame):
+    """Write each column of ``frame`` as arrays; returns the column schema"""
+    os.makedirs(directory, exist_ok=True)
+    schema = []
+    for column in frame.columns:
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            _save_array(directory, column + '.codes', series.cat.codes.to_numpy())
+            save_strings(directory, column + '.categories', series.cat.categories.tolist())
+            schema.append({'name': column, 'kind': 'category'})
+        elif series.dtype.kind in 'biuf':
+            _save_array(directory, column, series.to_numpy())
+            schema.append({'name': column, 'kind': 'numeric'})
+        else:
+            save_strings(directory, column, series.tolist())
+            schema.append({'name': column, 'kind': 'string'})
+    return schema
+
+
+def load_frame(directory, schema, mmap=True, tables=()):
+    """Rebuild a DataFrame written by save_frame.
+
+    String columns named in ``tables`` are returned separately as
+    StringTable objects instead of being decoded into the frame.
+    """
+    columns = {}
+    string_tables = {}
+    for entry in schema:
+        name = entry['name']
+        if entry['kind'] == 'numeric':
+            columns[name] = _load_array(directory, name, mmap)
+            continue
+        if entry['kind'] == 'category':
+            categories = load_strings(directory, name + '.categories', mmap)
+            columns[name] = pd.Categorical.from_codes(
+                _load_array(directory, name + '.codes', mmap),
+                decode_strings(categories.offsets, categories.buffer, categories.nulls))
+            continue
+        table = load_strings(directory, name, mmap)
+        if name in tables:
+            string_tables[name] = table
+        else:
+            columns[name] = pd.Series(decode_strings(table.offsets, table.buffer, table.nulls))
+    return pd.DataFrame(columns, copy=False), string_tables
+
+
+def save_csr(directory, name, matrix):
+    matrix = csr_matrix(matrix)
+    # One index dtype for both arrays so scipy does not copy them on load
+    index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+    _save_array(directory, name + '.data', matrix.data)
+    _save_array(directory, name + '.indices', matrix.indices.astype(index_dtype, copy=False))
+    _save_array(directory, name + '.indptr', matrix.indptr.astype(index_dtype, copy=False))
+    return list(matrix.shape)
+
+
+def load_csr(directory, name, shape, mmap=True):
+    return csr_matrix((
+        _load_array(directory, name + '.data', mmap),
+        _load_array(directory, name + '.indices', mmap),
+        _load_array(directory, name + '.indptr', mmap),
+    ), shape=tuple(shape), copy=False)
+
+
+def save_index(directory, name, index):
+    os.makedirs(directory, exist_ok=True)
+    save_strings(directory, name + '.tokens', index.tokens)
+    _save_array(directory, name + '.offsets', index.offsets)
+    _save_array(directory, name + '.postings', index.postings)
+
+
+def load_index(directory, name, mmap=True):
+    tokens = load_strings(directory, name + '.tokens', mmap)
+    return PostingIndex(
+        decode_strings(tokens.offsets, tokens.buffer, tokens.nulls),
+        _load_array(directory, name + '.offsets', mmap),
+        _load_array(directory, name + '.postings', mmap),
+    )
+
+
+def save_token_lists(directory, name, table):
+    os.makedirs(directory, exist_ok=True)
+    save_strings(directory, name + '.tokens', table.tokens)
+    _save_array(directory, name + '.offsets', table.offsets)
+    _save_array(directory, name + '.ids', table.ids)
+
+
+def load_token_lists(directory, name, mmap=True):
+    tokens = load_strings(directory, name + '.tokens', mmap)
+    return TokenLists(
+        decode_strings(tokens.offsets, tokens.buffer, tokens.nulls),
+        _load_array(directory, name + '.offsets', mmap),
+        _load_array(directory, name + '.ids', mmap),
+    )
+
+
+def save_text_index(directory, index):
+    os.makedirs(directory, exist_ok=True)
+    save_strings(directory, 'terms', index.terms)
+    for name in TextIndex.ARRAYS:
+        _save_array(directory, name, getattr(index, name))
+
+
+def load_text_index(directory, mmap=True):
+    terms = load_strings(directory, 'terms', mmap)
+    return TextIndex(
+        decode_strings(terms.offsets, terms.buffer, terms.nulls),
+        *[_load_array(directory, name, mmap) for name in TextIndex.ARRAYS]
+    )
+
+
+def save_ann_index(directory, index):
+    os.makedirs(directory, exist_ok=True)
+    for name in IVFIndex.ARRAYS:
+        _save_array(directory, name, getattr(index, name))
+    return {'n_probe': index.n_probe, 'rerank': index.rerank}
+
+
+def load_ann_index(directory, settings, mmap=True):
+    return IVFIndex(*[_load_array(directory, name, mmap) for name in IVFIndex.ARRAYS], **settings)
+
+
+def write_artifact(path, parts, sources):
+    """Atomically write an artifact directory.
+
+    ``parts`` holds ``frame`` (DataFrame), ``token_fields`` (name ->
+    TokenLists), ``matrices`` (name -> CSR), ``arrays`` (name -> ndarray),
+    ``indexes`` (name -> PostingIndex), ``text_index`` (TextIndex), ``ann``
+    (IVFIndex or None), ``vocabulary`` (terms in column order), ``idf`` and
+    ``params``.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.model-', dir=parent)
+    try:
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'sources': sources,
+            'params': parts['params'],
+            'columns': save_frame(os.path.join(staging, 'frame'), parts['frame']),
+            'token_fields': sorted(parts['token_fields']),
+            'matrices': {},
+            'arrays': sorted(parts['arrays']),
+            'indexes': sorted(parts['indexes']),
+            'ann': None,
+        }
+        for name, matrix in parts['matrices'].items():
+            manifest['matrices'][name] = save_csr(staging, name, matrix)
+        for name, array in parts['arrays'].items():
+            _save_array(staging, name, array)
+        for name, table in parts['token_fields'].items():
+            save_token_lists(os.path.join(staging, 'tokens'), name, table)
+        for name, index in parts['indexes'].items():
+            save_index(os.path.join(staging, 'index'), name, index)
+        save_text_index(os.path.join(staging, 'fulltext'), parts['text_index'])
+        if parts.get('ann') is not None:
+            manifest['ann'] = save_ann_index(os.path.join(staging, 'ann'), parts['ann'])
+        _save_array(staging, 'idf', parts['idf'])
+        with open(os.path.join(staging, 'vocabulary.json'), 'w') as f:
+            json.dump(parts['vocabulary'], f)
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.isdir(path):
+            retired = tempfile.mkdtemp(prefix='.model-old-', dir=parent)
+            os.rename(path, os.path.join(retired, 'model'))
+            os.rename(staging, path)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.rename(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def read_artifact(path, mmap=True, tables=()):
+    """Load the parts written by write_artifact"""
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise ValueError(f"No model artifact (format {FORMAT_VERSION}) at {path}")
+    with open(os.path.join(path, 'vocabulary.json')) as f:
+        vocabulary = json.load(f)
+    frame, string_tables = load_frame(os.path.join(path, 'frame'), manifest['columns'], mmap, tables)
+    return {
+        'params': manifest['params'],
+        # Same for every process loading this artifact (keys shared caches)
+        'fingerprint': hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16],
+        'frame': frame,
+        'tables': string_tables,
+        'token_fields': {
+            name: load_token_lists(os.path.join(path, 'tokens'), name, mmap)
+            for name in manifest['token_fields']
+        },
+        'matrices': {
+            name: load_csr(path, name, shape, mmap)
+            for name, shape in manifest['matrices'].items()
+        },
+        'arrays': {name: _load_array(path, name, mmap) for name in manifest['arrays']},
+        'indexes': {
+            name: load_index(os.path.join(path, 'index'), name, mmap)
+            for name in manifest['indexes']
+        },
+        'text_index': load_text_index(os.path.join(path, 'fulltext'), mmap),
+        'ann': None if manifest['ann'] is None else load_ann_index(os.path.join(path, 'ann'), manifest['ann'], mmap),
+        'vocabulary': vocabulary,
+        'idf': _load_array(path, 'idf', mmap),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    from recommender import MovieRecommender
+
+    parser = argparse.ArgumentParser(description='Build a MovieRecommender model artifact.')
+    parser.add_argument('movies')
+    parser.add_argument('credits')
+    parser.add_argument('output')
+    parser.add_argument('--workers', type=int, default=None, help='parse CSV chunks in a process pool')
+    parser.add_argument('--streaming', action='store_true',
+                        help='bound peak memory by the chunk size (hashed TF-IDF features)')
+    parser.add_argument('--chunksize', type=int, default=2000)
+    parser.add_argument('--engine', choices=('exact', 'ann'), default='exact',
+                        help='similarity engine: exact TF-IDF scores or an approximate (IVF) index')
+    args = parser.parse_args()
+
+    recommender = MovieRecommender.build(args.movies, args.credits, artifact_path=args.output,
+                                         workers=args.workers, streaming=args.streaming,
+                                         chunksize=args.chunksize, engine=args.engine)
+    print(f"Wrote model artifact for {len(recommender.combined_df)} movies to {args.output}")
@@ -0,0 +1,57 @@
+"""Benchmark the approximate (IVF) similarity engine.
+
+Builds the IVF index over the exact model's TF-IDF matrix, then reports,
+for a range of ``n_probe`` and ``rerank`` settings, recall@k against the
+exact cosine ranking and the latency of one deep similar-movies request::
+
+    python benchmarks/bench_ann.py --data /tmp/tmdb50k --top-n 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import add_data_args, load_model, per_call_us
+import ann
+from recommender import top_k
+
+
+def exact_similar(recommender, idx, top_n):
+    scores = recommender.similarity_scores(idx)
+    scores[idx] = -np.inf
+    return top_k(scores, top_n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--top-n', type=int, default=100)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--n-lists', type=int, default=None, help='IVF lists (default 2 * sqrt(N))')
+    args = parser.parse_args()
+
+    recommender = load_model(args)
+    start = time.perf_counter()
+    recommender.ann = ann.IVFIndex.build(recommender.tfidf_matrix, n_lists=args.n_lists)
+    print(f"IVF build           {time.perf_counter() - start:10.2f} s "
+          f"({len(recommender.ann.centroids)} lists, {recommender.ann.vectors.shape[1]} dims)")
+
+    rng = np.random.default_rng(0)
+    ids = rng.choice(len(recommender.combined_df), args.queries, replace=False)
+    repeat = max(1, args.repeat // 100)
+    truth = [set(exact_similar(recommender, i, args.top_n).tolist()) for i in ids]
+    exact = per_call_us(lambda i: exact_similar(recommender, i, args.top_n), ids, repeat)
+    print(f"exact               {exact:10.1f} us/request (top {args.top_n})")
+
+    for rerank in (1, 4, 10):
+        for n_probe in (1, 2, 4, 8, 16, 32):
+            recommender.ann.n_probe, recommender.ann.rerank = n_probe, rerank
+            found = [recommender.ann_neighbors([i], args.top_n)[0][0] for i in ids]
+            recall = np.mean([len(truth_ids.intersection(f.tolist())) / len(truth_ids)
+                              for truth_ids, f in zip(truth, found)])
+            latency = per_call_us(lambda i: recommender.ann_neighbors([i], args.top_n), ids, repeat)
+            print(f"n_probe {n_probe:3} rerank {rerank}  {latency:10.1f} us/request  "
+                  f"recall@{args.top_n} {recall:.3f}  ({exact / latency:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark batched chat answers.
+
+Times N messages sent one by one through process_query against the same
+messages answered by one process_queries call (identical messages answered
+once, similar-movie lookups batched)::
+
+    python benchmarks/bench_batch.py --data data --batch 500
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from common import add_data_args, load_model
+from nlp_model import CompleteMovieExpert
+
+TEMPLATES = [
+    'movies like {title}', 'similar to {title}', 'action movies', 'i feel sad',
+    'date night movies', 'popular movies', 'movies from {year}', 'thanks',
+]
+
+
+def sample_messages(recommender, rng, count):
+    titles = recommender.combined_df['title']
+    messages = []
+    for template in rng.choice(TEMPLATES, count):
+        row = int(rng.integers(len(titles)))
+        messages.append(template.format(title=titles[row], year=int(rng.integers(1970, 2016))))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    expert = CompleteMovieExpert(load_model(args, shared=True))
+    messages = sample_messages(expert.recommender, np.random.default_rng(0), args.batch)
+    repeat = max(1, args.repeat // 100)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            sequential = [expert.process_query(m) for m in messages]
+        one_by_one = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            batched = expert.process_queries(messages)
+        batch = (time.perf_counter() - start) / repeat
+
+    assert batched == sequential, 'batched answers differ from process_query'
+    print(f"{len(messages)} sequential calls  {one_by_one * 1e3:8.1f} ms ({len(messages) / one_by_one:8.0f} msg/s)")
+    print(f"one process_queries  {batch * 1e3:8.1f} ms ({len(messages) / batch:8.0f} msg/s, {one_by_one / batch:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Compare peak memory and time of the in-memory and streaming builds.
+
+Each build runs in a fresh child process so its peak RSS is measured on
+its own::
+
+    python benchmarks/bench_build_memory.py --data data --chunksize 2000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+from common import add_data_args
+from recommender import MovieRecommender
+
+
+def build(args, streaming, conn):
+    start = time.perf_counter()
+    MovieRecommender(os.path.join(args.data, 'movies.csv'), os.path.join(args.data, 'credits.csv'),
+                     streaming=streaming, chunksize=args.chunksize)
+    conn.send((time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--chunksize', type=int, default=2000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('fork')
+    for label, streaming in (('in-memory', False), ('streaming', True)):
+        parent, child = context.Pipe()
+        process = context.Process(target=build, args=(args, streaming, child))
+        process.start()
+        elapsed, peak_kb = parent.recv()
+        process.join()
+        print(f"{label:<10} {elapsed:7.2f} s  peak RSS {peak_kb / 1024:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Benchmark release-date queries (single years, decades, spans).
+
+Compares, per query, a substring scan of the raw release_date strings
+with find_movies_released (two binary searches in the date-sorted rows,
+then a top-k over that slice)::
+
+    python benchmarks/bench_dates.py --data /tmp/tmdb50k
+"""
+import argparse
+
+from common import add_data_args, load_model, per_call_us
+
+QUERIES = {
+    'year': [(year, year) for year in range(1990, 2016, 5)],
+    'decade': [(decade, decade + 9) for decade in range(1950, 2020, 10)],
+    'span': [(1980, 2000), (2000, 2010), (1950, 2015)],
+}
+
+
+def scan(recommender, first, last, top_n=8):
+    """The old approach: match year prefixes in the date strings, then rank"""
+    dates = recommender.combined_df['release_date'].astype(object).fillna('')
+    years = tuple(str(year) for year in range(first, last + 1))
+    found = dates.str.startswith(years).to_numpy() & ~recommender.removed
+    return recommender.rank_order[found[recommender.rank_order]][:top_n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    args = parser.parse_args()
+
+    recommender = load_model(args)
+    repeat = max(1, args.repeat // 20)
+    for kind, ranges in QUERIES.items():
+        scanned = per_call_us(lambda r: scan(recommender, *r), ranges, 1)
+        indexed = per_call_us(lambda r: recommender.find_movies_released(*r, 8), ranges, repeat)
+        print(f"{kind:<8} scan {scanned:10.1f} us   sorted index {indexed:8.1f} us ({scanned / indexed:.0f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark multi-filter queries ("comedy from 2005 with Jim Carrey").
+
+Compares, per query:
+  * a single-field lookup (find_movies),
+  * every field's matches read in full and intersected,
+  * the planner behind find_movies_matching (most selective field first,
+    the other fields only probed for its survivors),
+for constraints taken from real rows, so most queries have answers::
+
+    python benchmarks/bench_filters.py --data /tmp/tmdb50k
+"""
+import argparse
+
+import numpy as np
+
+from common import add_data_args, load_model, per_call_us
+from indexes import intersect
+
+
+def sample_constraints(recommender, rng, count):
+    """Genre, year and first cast member of random movies"""
+    tokens = {field: tokens for field, tokens in recommender.token_fields.items()}
+    dates = recommender.combined_df['release_date']
+    samples = []
+    for row in rng.choice(len(recommender.combined_df), count * 4, replace=False):
+        genres, cast = tokens['genres'].lists(row)[0], tokens['cast'].lists(row)[0]
+        if genres and genres[0] and cast and isinstance(dates[row], str):
+            samples.append({'genres': genres[:1], 'year': [dates[row][:4]], 'cast': cast[:1]})
+    return samples[:count]
+
+
+def full_intersection(recommender, constraints, top_n=8):
+    positions = intersect([recommender.field_indexes[field].match(terms) for field, terms in constraints.items()])
+    return recommender.rank_order[positions[:top_n]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    recommender = load_model(args)
+    samples = sample_constraints(recommender, np.random.default_rng(0), args.queries)
+    repeat = max(1, args.repeat // 20)
+
+    for field in ('genres', 'year', 'cast'):
+        single = per_call_us(lambda c: recommender.find_movies(field, c[field], 8), samples, repeat)
+        print(f"single {field:<26} {single:10.1f} us/query")
+    for fields in (('genres', 'year'), ('genres', 'year', 'cast')):
+        queries = [{field: c[field] for field in fields} for c in samples]
+        full = per_call_us(lambda c: full_intersection(recommender, c), queries, repeat)
+        planned = per_call_us(lambda c: recommender.find_movies_matching(c, 8), queries, repeat)
+        hits = np.mean([len(recommender.find_movies_matching(c, 8)) > 0 for c in queries])
+        name = ' + '.join(fields)
+        print(f"full   {name:<26} {full:10.1f} us/query")
+        print(f"plan   {name:<26} {planned:10.1f} us/query ({full / planned:.1f}x, {hits:.0%} answered)")
+
+if __name__ == '__main__':
+    main()
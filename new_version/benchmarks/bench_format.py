@@ -0,0 +1,58 @@
+"""Benchmark CompleteMovieExpert.format_movie_list.
+
+Compares the pre-rendered display column with the previous iterrows() +
+ast.literal_eval formatter on random 8-movie responses::
+
+    python benchmarks/bench_format.py --data data
+"""
+import argparse
+import ast
+
+import numpy as np
+
+from common import add_data_args, load_model, per_call_us
+from nlp_model import CompleteMovieExpert
+
+
+def legacy_format_movie_list(movies):
+    """The previous implementation, kept here for comparison"""
+    def extract_genres(genres_str):
+        try:
+            return ', '.join([genre['name'] for genre in ast.literal_eval(genres_str)])
+        except Exception:
+            return 'Various Genres'
+
+    response = ""
+    for i, (_, movie) in enumerate(movies.iterrows(), 1):
+        response += f"{i}. **{movie['title']}** ⭐ {movie['vote_average']}/10\n"
+        response += f"   🎭 {extract_genres(movie['genres'])}\n"
+        response += f"   📅 {movie['release_date']}\n"
+        response += f"   📖 {movie['overview'][:100]}...\n\n"
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--size', type=int, default=8, help='movies per response')
+    parser.add_argument('--shared', action='store_true', help='load the model in shared mode')
+    args = parser.parse_args()
+
+    recommender = load_model(args, shared=args.shared)
+    expert = CompleteMovieExpert(recommender)
+    rng = np.random.default_rng(0)
+    responses = [
+        recommender.movie_rows(rng.choice(len(recommender.combined_df), args.size, replace=False))
+        for _ in range(50)
+    ]
+    for movies in responses:
+        assert expert.format_movie_list(movies) == legacy_format_movie_list(movies)
+
+    legacy = per_call_us(legacy_format_movie_list, responses, args.repeat)
+    current = per_call_us(expert.format_movie_list, responses, args.repeat)
+    print(f"legacy   {legacy:8.1f} us/response")
+    print(f"display  {current:8.1f} us/response  ({legacy / current:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
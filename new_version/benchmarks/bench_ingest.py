@@ -0,0 +1,84 @@
+"""Benchmark CSV ingestion.
+
+Runs the previous read_csv + ast.literal_eval preprocessing and the
+chunked JSON ingestion on the same files and reports the time each
+takes (tests/test_ingest.py checks that their output matches)::
+
+    python benchmarks/bench_ingest.py --data data --workers 4
+"""
+import argparse
+import ast
+import os
+import time
+
+import pandas as pd
+
+from common import add_data_args
+import ingest
+from recommender import MovieRecommender
+
+
+def legacy_features(movies_path, credits_path):
+    """The previous preprocess_data, kept here for comparison"""
+    movies_df = pd.read_csv(movies_path)
+    credits_df = pd.read_csv(credits_path)
+    movies_df = movies_df.dropna(subset=['overview', 'genres']).reset_index(drop=True)
+
+    def safe_literal_eval(x):
+        try:
+            return ast.literal_eval(x)
+        except Exception:
+            return []
+
+    def get_director(crew_list):
+        if isinstance(crew_list, list):
+            for person in crew_list:
+                if person['job'] == 'Director':
+                    return person['name'].lower().replace(' ', '')
+        return ''
+
+    movies_df['genres_clean'] = movies_df['genres'].apply(safe_literal_eval).apply(
+        lambda x: ' '.join([genre['name'].lower() for genre in x]) if isinstance(x, list) else '')
+    movies_df['keywords_clean'] = movies_df['keywords'].apply(safe_literal_eval).apply(
+        lambda x: ' '.join([k['name'].lower().replace(' ', '') for k in x]) if isinstance(x, list) else '')
+    credits_df['top_cast'] = credits_df['cast'].apply(safe_literal_eval).apply(
+        lambda x: ' '.join([p['name'].lower().replace(' ', '') for p in x[:3]]) if isinstance(x, list) else '')
+    credits_df['director'] = credits_df['crew'].apply(safe_literal_eval).apply(get_director)
+
+    combined = movies_df.merge(credits_df[['movie_id', 'top_cast', 'director']],
+                               left_on='id', right_on='movie_id', how='left')
+    return (combined['overview'].fillna('') + ' ' + combined['genres_clean'] + ' ' +
+            combined['keywords_clean'] + ' ' + combined['top_cast'].fillna('') + ' ' +
+            combined['director'].fillna(''))
+
+
+def current_features(movies_path, credits_path, workers):
+    recommender = MovieRecommender.__new__(MovieRecommender)
+    recommender.movies_df = ingest.load_movies(movies_path, workers=workers)
+    recommender.credits_df = ingest.load_credits(credits_path, workers=workers)
+    recommender.preprocess_data()
+    return recommender.combined_df['combined_features']
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    paths = (os.path.join(args.data, 'movies.csv'), os.path.join(args.data, 'credits.csv'))
+
+    _, legacy = timed(legacy_features, *paths)
+    print(f"legacy literal_eval    {legacy:7.2f} s")
+    for workers in sorted({1, args.workers}):
+        _, elapsed = timed(current_features, *paths, workers)
+        print(f"json, {workers:2d} worker(s)     {elapsed:7.2f} s  ({legacy / elapsed:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Micro-benchmark for CompleteMovieExpert.detect_intent.
+
+Compares the keyword-prefiltered classifier (one keyword scan, then a
+search of the candidate intents only) with the previous approach of calling
+re.search for every raw pattern string, on a fixed query corpus::
+
+    python benchmarks/bench_intent.py --repeat 200
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_model import CompleteMovieExpert  # noqa: E402
+
+CORPUS = [
+    'action', 'comedy movies please', 'I want something romantic tonight',
+    'I am feeling sad', 'so bored right now', 'what should I watch on my birthday',
+    'date night with my girlfriend', 'movies like Inception', 'similar to The Dark Knight',
+    'movies with Tom Cruise', 'directed by Christopher Nolan', 'movies from 2010',
+    'popular movies', 'oscar winning films', 'hello', 'thanks a lot', 'bye',
+    'what can you do', 'tell me a joke', 'tell me an interesting fact',
+    'what time is it', 'heist movie with a twist ending',
+    'a quiet film about an old man and the sea', 'সিনেমা দেখব', 'মন খারাপ',
+    'zzzz qqqq xxxx', 'recommend me a good documentary about nature',
+    'scary ghost stories for halloween', 'something for the kids this weekend',
+    'anything with explosions and car chases',
+]
+
+
+def legacy_detect_intent(expert, user_input):
+    """The previous implementation: one re.search per raw pattern string"""
+    user_input_lower = user_input.lower().strip()
+    if user_input_lower in expert.exact_matches:
+        return expert.exact_matches[user_input_lower], None
+    for intent, patterns in expert.intent_patterns.items():
+        for pattern in patterns:
+            if re.search(pattern, user_input_lower):
+                return intent, re.search(pattern, user_input_lower)
+    return 'general_conversation', None
+
+
+def per_message_us(classify, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in CORPUS:
+            classify(query)
+    return (time.perf_counter() - start) / (repeat * len(CORPUS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    expert = CompleteMovieExpert(recommender=None)
+    for query in CORPUS:
+        assert expert.detect_intent(query)[0] == legacy_detect_intent(expert, query)[0], query
+
+    legacy = per_message_us(lambda q: legacy_detect_intent(expert, q), args.repeat)
+    prefiltered = per_message_us(expert.detect_intent, args.repeat)
+    print(f"legacy      {legacy:8.1f} us/message")
+    print(f"prefiltered {prefiltered:8.1f} us/message  ({legacy / prefiltered:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
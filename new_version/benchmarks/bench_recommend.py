@@ -0,0 +1,60 @@
+"""Benchmark similar-movie lookups.
+
+Compares, per request:
+  * the previous full-row Python sort (enumerate + sorted),
+  * on-demand scoring with argpartition top-k,
+  * the precomputed neighbor table,
+and a batch of titles scored one by one versus with one matrix product
+(the path behind get_recommendations_many)::
+
+    python benchmarks/bench_recommend.py --data data --top-n 100
+"""
+import argparse
+
+import numpy as np
+
+from common import add_data_args, load_model, per_call_us
+from recommender import top_k
+
+
+def legacy_similar(recommender, idx, top_n):
+    """The previous ranking: sort every (index, score) pair in Python"""
+    sim_scores = list(enumerate(recommender.similarity_scores(idx)))
+    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+    return [i for i, _ in sim_scores if i != idx][:top_n]
+
+
+def argpartition_similar(recommender, idx, top_n):
+    scores = recommender.similarity_scores(idx)
+    scores[idx] = -np.inf
+    return top_k(scores, top_n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--top-n', type=int, default=100, help='depth for the on-demand paths')
+    parser.add_argument('--batch', type=int, default=64)
+    args = parser.parse_args()
+
+    recommender = load_model(args)
+    rng = np.random.default_rng(0)
+    ids = rng.choice(len(recommender.combined_df), args.batch, replace=False)
+    repeat = max(1, args.repeat // 20)
+
+    legacy = per_call_us(lambda i: legacy_similar(recommender, i, args.top_n), ids, repeat)
+    partitioned = per_call_us(lambda i: argpartition_similar(recommender, i, args.top_n), ids, repeat)
+    table = per_call_us(lambda i: recommender.similar_ids(i, 10), ids, args.repeat)
+    print(f"sorted full row     {legacy:10.1f} us/request (top {args.top_n})")
+    print(f"argpartition        {partitioned:10.1f} us/request (top {args.top_n}, {legacy / partitioned:.1f}x)")
+    print(f"neighbor table      {table:10.1f} us/request (top 10)")
+
+    # Scoring only; building the result frames costs the same either way
+    single = per_call_us(lambda i: recommender.similar_ids(i, args.top_n), ids, repeat)
+    batched = per_call_us(lambda batch: recommender.similar_ids_many(batch, args.top_n), [ids], repeat)
+    batched /= len(ids)
+    print(f"one by one          {single:10.1f} us/title (top {args.top_n})")
+    print(f"one matrix product  {batched:10.1f} us/title (batch of {len(ids)}, {single / batched:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the result cache in front of similar/person/year/search queries.
+
+For each query kind, compares the uncached answer (the formatted list for
+similar/person/year, the result ids for search) with a hit in the
+in-process cache and a hit in the SQLite cache shared by workers::
+
+    python benchmarks/bench_result_cache.py --data /tmp/tmdb50k
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from common import add_data_args, load_model, per_call_us
+from nlp_model import CompleteMovieExpert
+from result_cache import MemoryResultCache, SqliteResultCache
+
+
+def sample_queries(recommender, rng, count):
+    """Titles, first cast members, years and title words of random movies"""
+    frame = recommender.combined_df
+    rows = rng.choice(len(frame), count, replace=False)
+    cast = [tokens[0] for tokens in (recommender.token_fields['cast'].lists(row)[0] for row in rows) if tokens]
+    dates = [frame['release_date'].iat[row] for row in rows]
+    years = [int(date[:4]) for date in dates if isinstance(date, str)]
+    return {
+        'similar': [frame['title'].iat[row] for row in rows],
+        'cast': cast,
+        'year': [(year, year, f'from {year}') for year in years],
+        'search': [frame['title'].iat[row].split()[0].lower() for row in rows],
+    }
+
+
+def calls(expert):
+    return {
+        'similar': expert.get_similar_movies,
+        'cast': lambda name: expert.get_movies_by_person(name, 'actor'),
+        'year': expert.get_movies_by_year,
+        'search': lambda query: expert.recommender.search_movies(query, 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    recommender = load_model(args)
+    expert = CompleteMovieExpert(recommender)
+    queries = sample_queries(recommender, np.random.default_rng(0), args.queries)
+    repeat = max(1, args.repeat // 20)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caches = {
+            'none': None,
+            'memory': MemoryResultCache(),
+            'sqlite': SqliteResultCache(os.path.join(tmp, 'results.db')),
+        }
+        for kind, call in calls(expert).items():
+            timings = []
+            for name, cache in caches.items():
+                recommender.result_cache = cache
+                for query in queries[kind]:
+                    call(query)  # fill the cache: the timed passes are all hits
+                timings.append(per_call_us(call, queries[kind], repeat))
+            print(f"{kind:<8} uncached {timings[0]:8.1f} us   memory hit {timings[1]:8.1f} us"
+                  f"   sqlite hit {timings[2]:8.1f} us")
+        print('sqlite', caches['sqlite'].stats())
+
+if __name__ == '__main__':
+    main()
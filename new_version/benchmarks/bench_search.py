@@ -0,0 +1,54 @@
+"""Benchmark search_movies.
+
+Compares the previous search (two case-insensitive substring scans over
+title and overview, ranked by rating) with the BM25 inverted index, for
+single words, multi-word queries, prefixes and phrases::
+
+    python benchmarks/bench_search.py --data data
+"""
+import argparse
+
+import numpy as np
+
+from common import add_data_args, load_model, per_call_us
+
+
+def legacy_search(recommender, query, top_n=5):
+    """The previous search: scan both columns, then rank matches by rating"""
+    df = recommender.combined_df
+    matches = df[recommender.text_contains('title', query) | recommender.text_contains('overview', query)]
+    return matches.nlargest(top_n, ['vote_average', 'popularity']).index
+
+
+def sample_queries(recommender, rng, count):
+    """Words and word pairs taken from real overviews"""
+    index = recommender.text_index
+    frequent = np.flatnonzero(np.diff(index.offsets) >= 5)
+    words = [index.terms[i] for i in rng.choice(frequent, count * 2)]
+    return {
+        'word': words[:count],
+        'two words': [f'{a} {b}' for a, b in zip(words[:count], words[count:])],
+        'prefix': [f'{word[:3]}*' for word in words[:count]],
+        'phrase': [f'"{a} {b}"' for a, b in zip(words[:count], words[count:])],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--top-n', type=int, default=5)
+    args = parser.parse_args()
+
+    recommender = load_model(args)
+    queries = sample_queries(recommender, np.random.default_rng(0), args.queries)
+    repeat = max(1, args.repeat // 20)
+
+    legacy = per_call_us(lambda q: legacy_search(recommender, q, args.top_n), queries['word'], repeat)
+    print(f"substring scan       {legacy:10.1f} us/query (single word)")
+    for kind, inputs in queries.items():
+        indexed = per_call_us(lambda q: recommender.text_index.search(q, args.top_n), inputs, args.repeat)
+        print(f"bm25 {kind:15} {indexed:10.1f} us/query ({legacy / indexed:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from recommender import MovieRecommender  # noqa: E402
+
+
+def add_data_args(parser):
+    parser.add_argument('--data', default=os.path.join(BASE_DIR, 'data'),
+                        help='directory with movies.csv and credits.csv')
+    parser.add_argument('--repeat', type=int, default=200)
+
+
+def load_model(args, shared=False):
+    """Load (building on first use) the artifact next to the benchmark CSVs"""
+    return MovieRecommender.load_or_build(
+        os.path.join(args.data, 'movies.csv'),
+        os.path.join(args.data, 'credits.csv'),
+        os.path.join(args.data, 'model'),
+        shared=shared,
+    )
+
+
+def per_call_us(call, inputs, repeat):
+    """Mean wall time of call(x) over repeat passes of inputs, in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in inputs:
+            call(value)
+    return (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6
@@ -0,0 +1,174 @@
+"""Benchmark suite with machine-readable results.
+
+Measures, on one dataset:
+  * cold start: building the model from the CSVs, and loading the saved
+    artifact, each in a fresh interpreter (wall time, peak RSS, and the
+    per-phase breakdown from the metrics module),
+  * per-call latency (mean, p50, p95, p99) and throughput of
+    get_recommendations, recommend_by_genre, search_movies and
+    CompleteMovieExpert.process_query,
+and writes them as JSON so runs can be compared over time::
+
+    python benchmarks/generate_data.py /tmp/tmdb5k --scale small
+    python benchmarks/run_suite.py --data /tmp/tmdb5k --output results/5k.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import BASE_DIR, add_data_args
+import metrics
+from nlp_model import CompleteMovieExpert
+from recommender import MovieRecommender
+
+GENRES = ['action', 'comedy', 'drama', 'thriller', 'romance', 'horror', 'science fiction', 'western']
+CHAT_TEMPLATES = ['movies like {title}', 'action movies', 'i feel sad', 'date night movies',
+                  'movies from {year}', 'popular movies', 'tell me a joke', 'something with {word}']
+
+
+def cold_start(task, paths, conn):
+    """Run in a fresh interpreter: build or load, then report time and peak RSS"""
+    start = time.perf_counter()
+    if task == 'build':
+        recommender = MovieRecommender.build(paths['movies'], paths['credits'], paths['artifact'])
+    else:
+        recommender = MovieRecommender.load(paths['artifact'], shared=True)
+    conn.send({
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'movies': len(recommender.combined_df),
+        'phases': {phase: seconds for (phase,), seconds in metrics.MODEL_LOAD_SECONDS.values.items()},
+    })
+
+
+def measure_cold_start(paths):
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for task in ('build', 'load'):
+        parent, child = context.Pipe()
+        process = context.Process(target=cold_start, args=(task, paths, child))
+        process.start()
+        results[task] = parent.recv()
+        process.join()
+    return results
+
+
+def latency(call, inputs):
+    """Per-call latency statistics (milliseconds) and throughput (calls/s)"""
+    times = np.empty(len(inputs))
+    for i, value in enumerate(inputs):
+        start = time.perf_counter()
+        call(value)
+        times[i] = time.perf_counter() - start
+    return {
+        'calls': len(inputs),
+        'mean_ms': float(times.mean() * 1e3),
+        'p50_ms': float(np.percentile(times, 50) * 1e3),
+        'p95_ms': float(np.percentile(times, 95) * 1e3),
+        'p99_ms': float(np.percentile(times, 99) * 1e3),
+        'throughput_per_s': float(len(times) / times.sum()),
+    }
+
+
+def sample_inputs(recommender, rng, count):
+    titles = recommender.combined_df['title']
+    words = [word for word in recommender.text_index.terms[::97] if word.isalpha()] or ['love']
+    rows = rng.integers(len(titles), size=count)
+    chat = [
+        template.format(title=titles[row], year=int(rng.integers(1950, 2017)), word=rng.choice(words))
+        for template, row in zip(rng.choice(CHAT_TEMPLATES, count), rows)
+    ]
+    return {
+        'get_recommendations': [titles[row] for row in rows],
+        'recommend_by_genre': list(rng.choice(GENRES, count)),
+        'search_movies': [str(word) for word in rng.choice(words, count)],
+        'process_query': chat,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_data_args(parser)
+    parser.add_argument('--calls', type=int, default=500, help='calls per measured API')
+    parser.add_argument('--output', help='JSON results file (default: print only)')
+    parser.add_argument('--skip-cold-start', action='store_true')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='movie-bench-')
+    paths = {
+        'movies': os.path.join(args.data, 'movies.csv'),
+        'credits': os.path.join(args.data, 'credits.csv'),
+        'artifact': os.path.join(scratch, 'model'),
+    }
+    try:
+        if args.skip_cold_start:
+            cold = None
+            MovieRecommender.build(paths['movies'], paths['credits'], paths['artifact'])
+        else:
+            cold = measure_cold_start(paths)
+            for task, result in cold.items():
+                print(f"cold {task:<6} {result['seconds']:8.2f} s   peak RSS {result['peak_rss_mib']:8.1f} MiB")
+
+        recommender = MovieRecommender.load(paths['artifact'], shared=True)
+        expert = CompleteMovieExpert(recommender)
+        inputs = sample_inputs(recommender, np.random.default_rng(0), args.calls)
+        calls = {
+            'get_recommendations': recommender.get_recommendations,
+            'recommend_by_genre': recommender.recommend_by_genre,
+            'search_movies': recommender.search_movies,
+            'process_query': expert.process_query,
+        }
+        results = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, call in calls.items():
+                results[name] = latency(call, inputs[name])
+        for name, stats in results.items():
+            print(f"{name:<20} mean {stats['mean_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms"
+                  f"  {stats['throughput_per_s']:10.0f} calls/s")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+        },
+        'dataset': {'path': os.path.abspath(args.data), 'movies': len(recommender.combined_df)},
+        'cold_start': cold,
+        'latency': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
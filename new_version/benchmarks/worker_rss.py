@@ -0,0 +1,92 @@
+"""Measure per-worker memory for the different ways of loading the model.
+
+Forks N worker processes the way gunicorn does and reports RSS and PSS of
+each one after it has loaded the model and answered a few queries::
+
+    python benchmarks/worker_rss.py data/movies.csv data/credits.csv data/model --workers 4
+
+Modes:
+    build    every worker parses the CSVs itself (the original behaviour)
+    copy     every worker loads the artifact into private memory
+    mmap     every worker memory-maps the artifact arrays
+    shared   mmap plus text columns left in the mapped files
+    preload  the master loads in shared mode once, workers inherit it
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memstats import process_memory  # noqa: E402
+from recommender import MovieRecommender  # noqa: E402
+
+MODES = ('build', 'copy', 'mmap', 'shared', 'preload')
+QUERIES = ['action', 'comedy', 'drama', 'love', 'space']
+
+
+def load(mode, args):
+    if mode == 'build':
+        return MovieRecommender(args.movies, args.credits)
+    if mode == 'copy':
+        return MovieRecommender.load(args.artifact, mmap=False)
+    return MovieRecommender.load(args.artifact, shared=mode in ('shared', 'preload'))
+
+
+def exercise(recommender):
+    for query in QUERIES:
+        recommender.recommend_by_genre(query)
+        recommender.search_movies(query)
+    title = recommender.combined_df['title'].iloc[0]
+    recommender.get_recommendations(title)
+
+
+def worker(mode, args, preloaded, conn):
+    recommender = preloaded if preloaded is not None else load(mode, args)
+    exercise(recommender)
+    conn.send(process_memory())
+    conn.recv()  # stay alive until every worker has been measured
+
+
+def measure(mode, args):
+    preloaded = None
+    if mode == 'preload':
+        preloaded = load(mode, args)
+        gc.freeze()
+    context = multiprocessing.get_context('fork')
+    pipes, processes = [], []
+    for _ in range(args.workers):
+        parent, child = context.Pipe()
+        process = context.Process(target=worker, args=(mode, args, preloaded, child))
+        process.start()
+        pipes.append(parent)
+        processes.append(process)
+    stats = [pipe.recv() for pipe in pipes]
+    for pipe, process in zip(pipes, processes):
+        pipe.send(None)
+        process.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('movies')
+    parser.add_argument('credits')
+    parser.add_argument('artifact')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    MovieRecommender.load_or_build(args.movies, args.credits, args.artifact)
+    print(f"{'mode':<8} {'rss/worker':>11} {'pss/worker':>11} {'private':>9} {'total pss':>10}  (MiB)")
+    for mode in args.modes:
+        stats = measure(mode, args)
+        mean = lambda key: sum(s.get(key, 0) for s in stats) / len(stats) / 1024
+        total_pss = sum(s.get('pss', 0) for s in stats) / 1024
+        print(f"{mode:<8} {mean('rss'):>11.1f} {mean('pss'):>11.1f} {mean('private'):>9.1f} {total_pss:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""Full-text search over movie titles, overviews and keywords.
+
+Documents are tokenized once into an inverted index stored as flat arrays:
+for every term, a slice of document ids (ascending) with their precomputed
+BM25 impacts, and for every posting the token positions inside the
+document. Queries are scored term-at-a-time with MaxScore pruning: terms
+are visited by decreasing upper bound, and once the bounds of the terms
+left cannot lift an unseen document into the top k, those terms are only
+probed for the documents already collected instead of being read in full.
+
+Query syntax: plain words are ranked by BM25 (a word that is not in the
+vocabulary falls back to a prefix match), ``word*`` is a prefix match, and
+``"quoted phrases"`` must appear in the document word for word.
+"""
+import bisect
+import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from indexes import intersect
+
+K1 = 1.2
+B = 0.75
+# Searchable columns and the weight of one token occurrence in each
+FIELDS = (('title', 2.0), ('overview', 1.0), ('keywords_clean', 1.0))
+# Documents tokenized per build step (bounds the Python token lists)
+BUILD_CHUNK = 20000
+# Most frequent vocabulary terms a prefix expands to
+PREFIX_TERMS = 50
+
+TOKEN = re.compile(r'\w+')
+QUERY_PART = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def _tokenize_chunk(frame, fields, vocabulary):
+    """Term ids, within-document positions and weights of one block of rows"""
+    terms, docs, positions, weights = [], [], [], []
+    start = np.zeros(len(frame), dtype=np.int64)
+    for column, weight in fields:
+        lists = [tokenize(text) if isinstance(text, str) else [] for text in frame[column]]
+        lengths = np.array([len(tokens) for tokens in lists], dtype=np.int64)
+        codes, uniques = pd.factorize(pd.Series(list(chain.from_iterable(lists)), dtype=object))
+        ids = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in uniques], dtype=np.int64)
+        doc = np.repeat(np.arange(len(frame)), lengths)
+        first = np.cumsum(lengths) - lengths
+        terms.append(ids[codes] if len(codes) else codes.astype(np.int64))
+        docs.append(doc)
+        positions.append(start[doc] + np.arange(len(doc)) - first[doc])
+        weights.append(np.full(len(doc), weight, dtype=np.float32))
+        # Leave a gap so phrases never run from one field into the next
+        start += lengths + 1
+    return [np.concatenate(parts) for parts in (terms, docs, positions, weights)]
+
+
+def kth_largest(scores, k):
+    return np.partition(scores, len(scores) - k)[len(scores) - k]
+
+
+def merge_postings(docs, scores, postings):
+    """Add (docs, impacts) pairs into a sorted candidate set, summing scores"""
+    if not postings:
+        return docs, scores
+    all_docs = np.concatenate([docs] + [p[0] for p in postings])
+    all_scores = np.concatenate([scores] + [p[1] for p in postings])
+    docs, inverse = np.unique(all_docs, return_inverse=True)
+    return docs, np.bincount(inverse, weights=all_scores, minlength=len(docs)).astype(np.float32)
+
+
+class TextIndex:
+    """Term -> (documents, BM25 impacts, positions), stored CSR-style"""
+
+    ARRAYS = ('offsets', 'docs', 'impacts', 'max_impact', 'pos_offsets', 'positions', 'stats')
+
+    def __init__(self, terms, offsets, docs, impacts, max_impact, pos_offsets, positions, stats):
+        self.terms = list(terms)
+        # Plain ndarray views: slicing a np.memmap is several times slower
+        self.offsets = np.asarray(offsets)
+        self.docs = np.asarray(docs)
+        self.impacts = np.asarray(impacts)
+        self.max_impact = np.asarray(max_impact)
+        self.pos_offsets = np.asarray(pos_offsets)
+        self.positions = np.asarray(positions)
+        # Collection statistics: number of documents and average length
+        self.stats = np.asarray(stats, dtype=np.float64)
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+
+    @classmethod
+    def from_frame(cls, frame, fields=FIELDS, base=None):
+        """Index the text columns of frame; document ids are row positions.
+
+        With a ``base`` index, documents are scored as if they had been
+        indexed together with base's collection, so the scores of the two
+        indexes can be merged (see MovieRecommender.add_movies).
+        """
+        n = len(frame)
+        vocabulary = {}
+        parts = []
+        for begin in range(0, n, BUILD_CHUNK):
+            terms, docs, positions, weights = _tokenize_chunk(frame.iloc[begin:begin + BUILD_CHUNK], fields, vocabulary)
+            parts.append((terms, docs + begin, positions, weights))
+        terms, docs, positions, weights = [
+            np.concatenate([part[i] for part in parts]) if parts else np.zeros(0) for i in range(4)
+        ]
+
+        # Renumber terms alphabetically so a prefix is a contiguous range
+        words = sorted(vocabulary)
+        renumber = np.empty(len(words), dtype=np.int32)
+        renumber[[vocabulary[word] for word in words]] = np.arange(len(words), dtype=np.int32)
+        terms = renumber[terms.astype(np.int64)]
+        docs = docs.astype(np.int32)
+
+        # One posting per (term, document) run, positions in reading order
+        order = np.lexsort((positions, docs, terms))
+        terms, docs, positions, weights = terms[order], docs[order], positions[order], weights[order]
+        starts = np.flatnonzero(np.r_[True, (terms[1:] != terms[:-1]) | (docs[1:] != docs[:-1])][:len(terms)])
+        posting_terms = terms[starts]
+        posting_docs = docs[starts]
+        tf = np.add.reduceat(weights, starts) if len(starts) else np.zeros(0, dtype=np.float32)
+
+        doc_length = np.bincount(docs, weights=weights, minlength=n)
+        counts = np.bincount(posting_terms, minlength=len(words))
+        if base is None:
+            total, df = n, counts
+            average = doc_length.mean() if n and doc_length.any() else 1.0
+        else:
+            total, average = base.stats[0] + n, base.stats[1]
+            df = counts + base.document_frequency(words)
+        idf = np.log1p((total - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * doc_length[posting_docs] / average)
+        impacts = (idf[posting_terms] * tf * (K1 + 1) / (tf + norm)).astype(np.float32)
+
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        max_impact = np.maximum.reduceat(impacts, offsets[:-1]) if len(impacts) else impacts
+        pos_offsets = np.append(starts, len(positions)).astype(np.int64)
+        wide = len(positions) and positions.max() >= 1 << 16
+        return cls(words, offsets, posting_docs, impacts, max_impact, pos_offsets,
+                   positions.astype(np.int32 if wide else np.uint16), [total, average])
+
+    def __len__(self):
+        return len(self.terms)
+
+    def document_frequency(self, words):
+        """Number of documents containing each word (0 for unknown words)"""
+        ids = np.array([self.term_ids.get(word, -1) for word in words], dtype=np.int64)
+        known = ids >= 0
+        df = np.zeros(len(ids), dtype=np.int64)
+        df[known] = self.offsets[ids[known] + 1] - self.offsets[ids[known]]
+        return df
+
+    def postings(self, term):
+        """Document ids and impacts of one term id"""
+        start, stop = self.offsets[term], self.offsets[term + 1]
+        return self.docs[start:stop], self.impacts[start:stop]
+
+    def expand(self, prefix):
+        """Ids of the (most frequent) terms starting with prefix"""
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + '\U0010ffff', lo)
+        ids = np.arange(lo, hi)
+        if len(ids) > PREFIX_TERMS:
+            df = self.offsets[ids + 1] - self.offsets[ids]
+            ids = np.sort(ids[np.argsort(-df, kind='stable')[:PREFIX_TERMS]])
+        return ids.tolist()
+
+    def parse(self, query):
+        """Split a query into scored term ids and phrases (lists of term ids).
+
+        Returns ``(terms, None)`` when a phrase has a word that is not in
+        the vocabulary, since nothing can match it.
+        """
+        terms, phrases = [], []
+        for phrase, word in QUERY_PART.findall(query):
+            if phrase:
+                ids = [self.term_ids.get(token) for token in tokenize(phrase)]
+                if None in ids:
+                    return terms, None
+                if ids:
+                    terms.extend(ids)
+                    phrases.append(ids)
+                continue
+            tokens = tokenize(word)
+            for i, token in enumerate(tokens):
+                prefix = word.endswith('*') and i == len(tokens) - 1
+                if not prefix and token in self.term_ids:
+                    terms.append(self.term_ids[token])
+                else:
+                    terms.extend(self.expand(token))
+        return list(dict.fromkeys(terms)), phrases
+
+    def probe(self, docs, terms):
+        """Summed impacts of terms for the given (sorted) documents"""
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for term in terms:
+            term_docs, impacts = self.postings(term)
+            if len(term_docs) == 0:
+                continue
+            at = np.minimum(np.searchsorted(term_docs, docs), len(term_docs) - 1)
+            hit = term_docs[at] == docs
+            scores[hit] += impacts[at[hit]]
+        return scores
+
+    def phrase_docs(self, phrase):
+        """Documents where the terms of phrase occur consecutively"""
+        lists = [self.postings(term)[0] for term in phrase]
+        docs = intersect(lists)
+        if len(docs) == 0 or len(phrase) == 1:
+            return docs
+        slots = [self.offsets[term] + np.searchsorted(postings, docs) for term, postings in zip(phrase, lists)]
+        matched = []
+        for j, doc in enumerate(docs):
+            common = None
+            for shift, at in enumerate(slots):
+                posting = at[j]
+                found = self.positions[self.pos_offsets[posting]:self.pos_offsets[posting + 1]].astype(np.int64) - shift
+                common = found if common is None else np.intersect1d(common, found, assume_unique=True)
+                if len(common) == 0:
+                    break
+            if len(common):
+                matched.append(doc)
+        return np.array(matched, dtype=docs.dtype)
+
+    def max_score(self, terms, k):
+        """Candidate documents and scores that contain the top k for terms.
+
+        Postings are merged in batches that at least double the candidate
+        set, so the threshold it gives is slightly stale between merges;
+        it only ever grows, so a stale value is a safe lower bound.
+        """
+        terms = sorted(terms, key=lambda term: -self.max_impact[term])
+        # remaining[i]: best score a document could get from terms[i:]
+        remaining = np.cumsum(self.max_impact[terms][::-1])[::-1]
+        docs = np.zeros(0, dtype=np.int32)
+        scores = np.zeros(0, dtype=np.float32)
+        threshold = -np.inf
+        pending = []
+        for i, term in enumerate(terms):
+            if remaining[i] < threshold:
+                # No unseen document can reach the top k any more
+                docs, scores = merge_postings(docs, scores, pending)
+                threshold = kth_largest(scores, k)
+                keep = scores + remaining[i] >= threshold
+                docs = docs[keep]
+                return docs, scores[keep] + self.probe(docs, terms[i:])
+            pending.append(self.postings(term))
+            if sum(len(p[0]) for p in pending) >= len(docs):
+                docs, scores = merge_postings(docs, scores, pending)
+                pending = []
+                if len(docs) >= k:
+                    threshold = kth_largest(scores, k)
+        return merge_postings(docs, scores, pending)
+
+    def search(self, query, k=10):
+        """Ids of the k best documents for query, best first (ties by id)"""
+        return self.search_scored(query, k)[0]
+
+    def search_scored(self, query, k=10):
+        """The k best documents for query and their scores, best first (ties by id)"""
+        terms, phrases = self.parse(query)
+        if phrases is None or not terms or k <= 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        if phrases:
+            docs = intersect([self.phrase_docs(phrase) for phrase in phrases])
+            scores = self.probe(docs, terms)
+        else:
+            docs, scores = self.max_score(terms, k)
+
+        if len(scores) > k:
+            keep = scores >= kth_largest(scores, k)
+            docs, scores = docs[keep], scores[keep]
+        order = np.lexsort((docs, -scores))[:k]
+        return docs[order], scores[order]
@@ -0,0 +1,26 @@
+"""Gunicorn settings.
+
+The app module is imported once in the master process (cheaply: the model
+is not loaded at import) and workers are forked from it. Each worker then
+loads the model in a background thread, so it answers /healthz and
+/readyz as soon as it starts. Loading after the fork, rather than in the
+master, keeps the port bound during a slow load; the artifact's arrays are
+memory-mapped, so the workers still share those pages through the page
+cache, and only the decoded Python objects are per worker.
+"""
+import gc
+
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Objects created while importing the app are moved to a permanent
+    # generation so the workers' garbage collector never writes to them,
+    # which would otherwise un-share their pages one by one.
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    loader = worker.wsgi.extensions.get('model_loader')
+    if loader is not None:
+        loader.start()
@@ -0,0 +1,69 @@
+"""TF-IDF over hashed n-grams that can be fitted one chunk at a time.
+
+TfidfVectorizer has to see every document at once and keeps a vocabulary of
+every n-gram before trimming it to ``max_features``. This variant hashes
+n-grams into a fixed number of buckets, so fitting only keeps per-bucket
+term and document counts. Each chunk's count matrix is kept instead of its
+text. Once all chunks are in, the ``max_features`` most frequent buckets
+are selected and weighted the same way TfidfVectorizer weights its
+vocabulary (smoothed idf, L2-normalized rows). Rare hash collisions are the
+only difference.
+"""
+import numpy as np
+from scipy.sparse import vstack
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+N_BUCKETS = 2 ** 20
+
+
+class HashedTfidfVectorizer:
+    def __init__(self, stop_words='english', max_features=5000, ngram_range=(1, 2), n_buckets=N_BUCKETS):
+        self.stop_words = stop_words
+        self.max_features = max_features
+        self.ngram_range = tuple(ngram_range)
+        self.n_buckets = n_buckets
+        self.hasher = HashingVectorizer(
+            stop_words=stop_words, ngram_range=self.ngram_range, n_features=n_buckets,
+            alternate_sign=False, norm=None
+        )
+        self.term_counts = np.zeros(n_buckets, dtype=np.float64)
+        self.doc_counts = np.zeros(n_buckets, dtype=np.int64)
+        self.n_docs = 0
+        self.columns_ = None
+        self.idf_ = None
+
+    def get_params(self):
+        return {
+            'hashing': True,
+            'stop_words': self.stop_words,
+            'max_features': self.max_features,
+            'ngram_range': list(self.ngram_range),
+            'n_buckets': self.n_buckets,
+        }
+
+    def partial_fit(self, documents):
+        """Count one chunk of documents; returns its bucket count matrix"""
+        counts = self.hasher.transform(documents)
+        self.term_counts += np.asarray(counts.sum(axis=0)).ravel()
+        self.doc_counts += np.bincount(counts.indices, minlength=self.n_buckets)
+        self.n_docs += counts.shape[0]
+        return counts
+
+    def finalize(self, chunk_counts):
+        """Pick the kept buckets and turn the collected counts into TF-IDF rows"""
+        seen = np.flatnonzero(self.term_counts)
+        keep = seen[np.argsort(-self.term_counts[seen], kind='stable')[:self.max_features]]
+        self.columns_ = np.sort(keep).astype(np.int64)
+        document_frequency = self.doc_counts[self.columns_]
+        self.idf_ = np.log((1 + self.n_docs) / (1 + document_frequency)) + 1
+        # The fitting statistics are no longer needed
+        self.term_counts = self.doc_counts = None
+        return self.weight(vstack(chunk_counts, format='csr'))
+
+    def weight(self, counts):
+        matrix = counts[:, self.columns_].multiply(self.idf_).tocsr()
+        return normalize(matrix, norm='l2', copy=False)
+
+    def transform(self, documents):
+        return self.weight(self.hasher.transform(documents))
@@ -0,0 +1,215 @@
+"""Inverted indexes over the movie catalog.
+
+Every posting list holds *rank positions* rather than row ids: positions in
+the catalog sorted best-first by (vote_average, popularity). Posting lists
+are therefore already in result order, so taking the top n of a lookup, a
+union or an intersection never needs a sort over the whole catalog.
+
+TokenLists is the forward direction: each row's tokens as int32 ids into
+one shared vocabulary, so a token repeated across rows is stored once.
+"""
+import sys
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+
+def rank_order(frame):
+    """Row ids sorted by vote_average, then popularity (both descending).
+
+    Ties keep row order and missing values sort last, matching
+    ``DataFrame.nlargest(n, ['vote_average', 'popularity'])``.
+    """
+    votes = frame['vote_average'].fillna(-np.inf).to_numpy(dtype=np.float64)
+    popularity = frame['popularity'].fillna(-np.inf).to_numpy(dtype=np.float64)
+    rows = np.arange(len(frame))
+    return np.lexsort((rows, -popularity, -votes)).astype(np.int32)
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores, best first (ties keep index order)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.lexsort((top, -scores[top]))]
+
+
+class TokenLists:
+    """One list of tokens per row, stored CSR-style as int32 ids into a vocabulary"""
+
+    def __init__(self, tokens, offsets, ids):
+        self.tokens = list(tokens)
+        self.offsets = np.asarray(offsets)
+        self.ids = np.asarray(ids)
+
+    @classmethod
+    def from_token_lists(cls, token_lists):
+        token_lists = list(token_lists)
+        offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum([len(tokens) for tokens in token_lists], out=offsets[1:])
+        codes, tokens = pd.factorize(pd.Series(list(chain.from_iterable(token_lists)), dtype=object), sort=True)
+        return cls(list(tokens), offsets, codes.astype(np.int32))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lists(self, start=0):
+        """The token lists of rows start, start + 1, ..."""
+        bounds = self.offsets[start:].tolist()
+        words = np.asarray(self.tokens, dtype=object)[self.ids[bounds[0]:bounds[-1]]].tolist()
+        return [words[a - bounds[0]:b - bounds[0]] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def joined(self, sep=' ', start=0):
+        return [sep.join(tokens) for tokens in self.lists(start)]
+
+    def appended(self, token_lists):
+        """A copy with one row per token list added (new tokens extend the vocabulary)"""
+        tokens = list(self.tokens)
+        token_ids = {token: i for i, token in enumerate(tokens)}
+        ids, lengths = [], []
+        for row_tokens in token_lists:
+            lengths.append(len(row_tokens))
+            for token in row_tokens:
+                if token not in token_ids:
+                    token_ids[token] = len(tokens)
+                    tokens.append(token)
+                ids.append(token_ids[token])
+        offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths, dtype=np.int64)])
+        return TokenLists(tokens, offsets, np.concatenate([self.ids, np.array(ids, dtype=np.int32)]))
+
+    def nbytes(self):
+        """Bytes held by the arrays and the vocabulary strings"""
+        return self.offsets.nbytes + self.ids.nbytes + sum(map(sys.getsizeof, self.tokens))
+
+
+class PostingIndex:
+    """Token -> sorted int32 array of rank positions, stored CSR-style"""
+
+    def __init__(self, tokens, offsets, postings):
+        self.tokens = list(tokens)
+        # Plain ndarray views: slicing a np.memmap is several times slower
+        self.offsets = np.asarray(offsets)
+        self.postings = np.asarray(postings)
+        self.token_ids = {token: i for i, token in enumerate(self.tokens)}
+
+    @classmethod
+    def from_token_lists(cls, token_lists, rank):
+        """Build from one iterable of tokens per row; ``rank[row]`` is its position"""
+        rows, keys = [], []
+        for row, tokens in enumerate(token_lists):
+            for token in set(tokens):
+                if token:
+                    rows.append(row)
+                    keys.append(token)
+        if not keys:
+            return cls([], np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+
+        codes, tokens = pd.factorize(pd.Series(keys, dtype=object), sort=True)
+        positions = np.asarray(rank, dtype=np.int32)[np.asarray(rows)]
+        order = np.lexsort((positions, codes))
+        counts = np.bincount(codes, minlength=len(tokens))
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(list(tokens), offsets, positions[order])
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def updated(self, order, rank, token_lists, start, removed):
+        """A copy with rows ``start, start + 1, ...`` added and removed rows dropped.
+
+        ``order`` is the rank order the index was built with and ``rank``
+        the new rank of every row; existing postings are mapped back to
+        rows and re-sorted, so no row is tokenized again.
+        """
+        tokens = list(self.tokens)
+        token_ids = dict(self.token_ids)
+        rows = [np.asarray(order)[self.postings]]
+        codes = [np.repeat(np.arange(len(tokens)), np.diff(self.offsets))]
+        added_rows, added_codes = [], []
+        for row, row_tokens in enumerate(token_lists, start):
+            for token in set(row_tokens):
+                if token:
+                    if token not in token_ids:
+                        token_ids[token] = len(tokens)
+                        tokens.append(token)
+                    added_rows.append(row)
+                    added_codes.append(token_ids[token])
+        rows = np.concatenate(rows + [np.array(added_rows, dtype=np.int64)])
+        codes = np.concatenate(codes + [np.array(added_codes, dtype=np.int64)])
+        keep = ~np.asarray(removed)[rows]
+        positions = np.asarray(rank, dtype=np.int32)[rows[keep]]
+        codes = codes[keep]
+        ordering = np.lexsort((positions, codes))
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(tokens)), out=offsets[1:])
+        return PostingIndex(tokens, offsets, positions[ordering])
+
+    def lookup(self, token):
+        """Rank positions of rows carrying exactly this token"""
+        i = self.token_ids.get(token)
+        if i is None:
+            return self.postings[:0]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def tokens_containing(self, text):
+        """Tokens with ``text`` as a substring (scans the vocabulary, not the rows)"""
+        return [token for token in self.tokens if text in token]
+
+    def term_ids(self, terms, substring=True):
+        """Ids of the tokens ``terms`` match.
+
+        A term that is not itself a token falls back to every token that
+        contains it, mirroring the substring search this index replaces.
+        """
+        ids = []
+        for term in terms:
+            if term in self.token_ids:
+                ids.append(self.token_ids[term])
+            elif substring:
+                ids.extend(self.token_ids[token] for token in self.tokens_containing(term))
+        return ids
+
+    def count(self, ids):
+        """Postings held by the tokens: an upper bound on the positions they match"""
+        return int(sum(self.offsets[i + 1] - self.offsets[i] for i in ids))
+
+    def postings_of(self, ids):
+        return [self.postings[self.offsets[i]:self.offsets[i + 1]] for i in ids]
+
+    def match(self, terms, substring=True):
+        """Positions matching any of ``terms`` (see term_ids)"""
+        return union(self.postings_of(self.term_ids(terms, substring)))
+
+    def filter(self, positions, ids):
+        """The sorted ``positions`` held by any of the tokens.
+
+        Each candidate is binary-searched in the posting lists, so the cost
+        follows the (small) candidate set rather than the list lengths.
+        """
+        keep = np.zeros(len(positions), dtype=bool)
+        for postings in self.postings_of(ids):
+            if len(postings):
+                found = np.minimum(np.searchsorted(postings, positions), len(postings) - 1)
+                keep |= postings[found] == positions
+        return positions[keep]
+
+
+def union(lists):
+    lists = [p for p in lists if len(p)]
+    if not lists:
+        return np.zeros(0, dtype=np.int32)
+    if len(lists) == 1:
+        return lists[0]
+    return np.unique(np.concatenate(lists))
+
+
+def intersect(lists):
+    result = None
+    for postings in sorted(lists, key=len):
+        result = postings if result is None else np.intersect1d(result, postings, assume_unique=True)
+        if len(result) == 0:
+            break
+    return result if result is not None else np.zeros(0, dtype=np.int32)
@@ -0,0 +1,166 @@
+"""CSV ingestion for MovieRecommender.
+
+TMDB stores genres, keywords, cast and crew as JSON lists inside CSV cells.
+These helpers parse them with the C JSON decoder, and only as far as needed:
+just the first three cast entries are decoded, and the crew list is searched
+for its Director entry instead of being decoded whole. Those shortcuts only
+run on cells that end with the list's closing bracket, so a cell cut off
+after the decoded entries still yields nothing. Anything that is not valid
+JSON (for example Python-style single quotes) falls back to
+``ast.literal_eval``, so the output matches the previous parser.
+
+Files are read in chunks, optionally spread over a process pool, and the
+raw cast/crew text is dropped as soon as a chunk is processed.
+"""
+import ast
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import metrics
+
+CHUNK_SIZE = 2000
+
+# movies.csv columns the model needs; the rest are never loaded when streaming
+MOVIE_COLUMNS = [
+    'id', 'title', 'genres', 'keywords', 'overview', 'vote_average',
+    'popularity', 'release_date'
+]
+
+_decoder = json.JSONDecoder()
+_DIRECTOR = '"job": "Director"'
+
+
+def parse_list(text):
+    """Parse a JSON-ish list cell; returns None when it cannot be parsed"""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        try:
+            return ast.literal_eval(text)
+        except Exception:
+            return None
+
+
+def first_entries(text, n):
+    """Decode only the first n objects of a JSON list of objects"""
+    entries = []
+    start = text.find('{')
+    while start != -1 and len(entries) < n:
+        entry, end = _decoder.raw_decode(text, start)
+        entries.append(entry)
+        start = text.find('{', end)
+    return entries
+
+
+def closed_list(text):
+    """Whether a cell ends like a complete list (the partial decoders check nothing past their entries)"""
+    return isinstance(text, str) and text.rstrip().endswith(']')
+
+
+def squash(name):
+    return name.lower().replace(' ', '')
+
+
+def names(entries, squash_spaces=True):
+    if not isinstance(entries, list):
+        return ''
+    if squash_spaces:
+        return ' '.join([squash(entry['name']) for entry in entries])
+    return ' '.join([entry['name'].lower() for entry in entries])
+
+
+def top_cast(text):
+    """First three cast names, lowercased with spaces removed"""
+    if not isinstance(text, str):
+        return ''
+    try:
+        if closed_list(text):
+            return names(first_entries(text, 3))
+    except ValueError:
+        pass
+    cast = parse_list(text)
+    return names(cast[:3]) if isinstance(cast, list) else ''
+
+
+def director(text):
+    """First crew member whose job is Director, lowercased without spaces"""
+    if closed_list(text):
+        position = text.find(_DIRECTOR)
+        if position != -1:
+            start = text.rfind('{', 0, position)
+            try:
+                entry, _ = _decoder.raw_decode(text, start)
+                if entry.get('job') == 'Director':
+                    return squash(entry['name'])
+            except ValueError:
+                pass
+    crew = parse_list(text)
+    if isinstance(crew, list):
+        for person in crew:
+            if person['job'] == 'Director':
+                return squash(person['name'])
+    return ''
+
+
+def genre_names(genres):
+    """Original-case genre names joined by '|', or None if unparseable"""
+    if not isinstance(genres, list):
+        return None
+    return '|'.join([genre['name'] for genre in genres])
+
+
+def process_movies_chunk(chunk):
+    """Drop unusable rows and parse genres/keywords"""
+    chunk = chunk.dropna(subset=['overview', 'genres'])
+    genres = [parse_list(text) for text in chunk['genres']]
+    chunk = chunk.assign(
+        genre_names=[genre_names(g) for g in genres],
+        genres_clean=[names(g, squash_spaces=False) for g in genres],
+        keywords_clean=[names(parse_list(text)) for text in chunk['keywords']],
+    )
+    return chunk
+
+
+def process_credits_chunk(chunk):
+    """Reduce raw credits to movie_id, top_cast and director"""
+    return pd.DataFrame({
+        'movie_id': chunk['movie_id'].to_numpy(),
+        'top_cast': [top_cast(text) for text in chunk['cast']],
+        'director': [director(text) for text in chunk['crew']],
+    })
+
+
+def timed_chunks(reader):
+    """Yield the chunks of a CSV reader, timing the reads as the read_csv phase"""
+    reader = iter(reader)
+    while True:
+        with metrics.load_phase('read_csv'):
+            chunk = next(reader, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def read_processed(path, process, chunksize=CHUNK_SIZE, workers=None):
+    """Read a CSV in chunks and concatenate process(chunk) for each one"""
+    chunks = timed_chunks(pd.read_csv(path, chunksize=chunksize))
+    if workers and workers > 1:
+        # Workers parse while the next chunks are read; the phases overlap
+        with metrics.load_phase('parse'), ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(process, chunks))
+    else:
+        parts = []
+        for chunk in chunks:
+            with metrics.load_phase('parse'):
+                parts.append(process(chunk))
+    return pd.concat(parts, ignore_index=True)
+
+
+def load_movies(path, chunksize=CHUNK_SIZE, workers=None):
+    return read_processed(path, process_movies_chunk, chunksize, workers)
+
+
+def load_credits(path, chunksize=CHUNK_SIZE, workers=None):
+    return read_processed(path, process_credits_chunk, chunksize, workers)
@@ -0,0 +1,64 @@
+"""Background model loading for the web app.
+
+The app binds its port and answers health checks at once; the model (and
+the pandas / scikit-learn imports it needs) is loaded in a daemon thread,
+and requests that need it get a fast 503 until it is ready.
+"""
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    """Runs ``load()`` once in a background thread and keeps its result"""
+
+    def __init__(self, load):
+        self.load = load
+        self.state = 'idle'
+        self.value = None
+        self.error = None
+        self.seconds = None
+        self.phases = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start loading (only the first call does anything)"""
+        with self.lock:
+            if self.state != 'idle':
+                return
+            self.state = 'loading'
+        threading.Thread(target=self.run, name='model-loader', daemon=True).start()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            value = self.load()
+        except Exception as e:
+            logger.exception("Model loading failed")
+            self.error = f'{type(e).__name__}: {e}'
+            self.state = 'failed'
+        else:
+            # Publish the value before the state, so ready implies a value
+            self.value = value
+            self.state = 'ready'
+            metrics.MODEL_READY.set(value=1)
+        finally:
+            self.seconds = time.perf_counter() - start
+            self.phases = {phase: seconds for (phase,), seconds in metrics.MODEL_LOAD_SECONDS.values.items()}
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        status = {'status': self.state}
+        if self.seconds is not None:
+            status['load_seconds'] = self.seconds
+            status['phases'] = self.phases
+        if self.error:
+            status['error'] = self.error
+        return status
@@ -0,0 +1,29 @@
+"""Per-process memory statistics (Linux /proc)."""
+import os
+import resource
+
+
+def process_memory(pid='self'):
+    """Memory of a process in kB: rss, pss, shared and private pages.
+
+    PSS splits every shared page evenly between the processes mapping it,
+    so summing PSS over workers gives their real combined footprint.
+    Falls back to peak RSS where /proc/<pid>/smaps_rollup is unavailable.
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        if pid not in ('self', os.getpid()):
+            raise
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
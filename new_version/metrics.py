@@ -0,0 +1,182 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain Python objects guarded by one
+lock each; recording a value costs a dict lookup and a bisect, so the
+timers stay on in production. Each gunicorn worker keeps its own values,
+so scrape every worker (or sum across them) to see the whole service.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from 50 us to 10 s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.values = {}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.extend(self.samples(labels, value))
+        return lines
+
+    def samples(self, labels, value):
+        return [f'{self.name}{_labels(self.labelnames, labels)} {value!r}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        with self.lock:
+            self.values[labels] = value
+
+    def add(self, *labels, amount):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # per-bucket counts (last one is +Inf), then the running sum
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[i] += 1
+            state[-1] += value
+
+    def samples(self, labels, state):
+        lines = []
+        cumulative = 0
+        bounds = [repr(b) for b in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, state):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames + ("le",), labels + (bound,))} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {state[-1]!r}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'movie_stage_seconds', 'Time spent in each stage of answering a chat message.', ['stage']))
+CHAT_REQUESTS = REGISTRY.register(Counter(
+    'movie_chat_requests_total', 'Chat messages answered, by detected intent.', ['intent']))
+CHAT_SECONDS = REGISTRY.register(Histogram(
+    'movie_chat_seconds', 'Time to answer one chat message, by detected intent.', ['intent']))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    'movie_http_request_seconds', 'HTTP request latency by endpoint and status.', ['endpoint', 'status']))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    'movie_model_load_seconds', 'Time the last model build or load spent in each phase.', ['phase']))
+MODEL_READY = REGISTRY.register(Gauge(
+    'movie_model_ready', '1 once the model is loaded and serving, 0 before.'))
+MODEL_READY.set(value=0)
+RESULT_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'movie_result_cache_lookups_total', 'Result cache lookups, by query kind and hit or miss.',
+    ['kind', 'result']))
+RESPONSE_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'movie_response_cache_lookups_total', 'Precomputed chat answer lookups, by query and hit or miss.',
+    ['query', 'result']))
+
+
+@contextmanager
+def timer(histogram, *labels):
+    """Observe the wall time of a with block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(*labels, value=time.perf_counter() - start)
+
+
+def stage(name):
+    return timer(STAGE_SECONDS, name)
+
+
+def timed(name):
+    """Decorator recording each call of a function as a stage"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(name, value=time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def load_phase(name):
+    """Add the time of a with block to a model load phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODEL_LOAD_SECONDS.add(name, amount=time.perf_counter() - start)
+
+
+def render():
+    return REGISTRY.render()
@@ -1,17 +1,141 @@
 import re
 import random
+import logging
+import threading
+import time
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from datetime import datetime
+import metrics
+from recommender import NOT_FOUND
+from sessions import MemorySessionStore
+
+logger = logging.getLogger(__name__)
+
+GENRE_INTENTS = ['action_movies', 'romantic_movies', 'comedy_movies',
+                 'horror_movies', 'sci-fi_movies', 'drama_movies',
+                 'fantasy_movies', 'animation_movies', 'family_movies',
+                 'documentary_movies']
+MOOD_INTENTS = ['sad_mood', 'happy_mood', 'bored_mood', 'stressed_mood',
+                'romantic_mood', 'energetic_mood', 'relaxed_mood']
+OCCASION_INTENTS = ['birthday', 'date_night', 'friends_hangout',
+                    'family_time', 'alone_time']
+
+# Request words that say nothing about the movie being described
+DESCRIPTION_FILLER = re.compile(
+    r"\b(?:movies?|films?|flicks?|watch|show|find|recommend|suggest|want|need|looking|something|some|good|great)\b"
+)
+
+# Words naming a genre in a request, mapped to the catalog's genre tokens
+GENRE_WORDS = {
+    'action': 'action', 'adventure': 'adventure', 'adventures': 'adventure',
+    'animation': 'animation', 'animated': 'animation', 'cartoon': 'animation', 'cartoons': 'animation',
+    'comedy': 'comedy', 'comedies': 'comedy', 'crime': 'crime',
+    'documentary': 'documentary', 'documentaries': 'documentary', 'drama': 'drama', 'dramas': 'drama',
+    'family': 'family', 'fantasy': 'fantasy', 'history': 'history', 'historical': 'history',
+    'horror': 'horror', 'music': 'music', 'musical': 'music', 'musicals': 'music',
+    'mystery': 'mystery', 'mysteries': 'mystery', 'romance': 'romance', 'romantic': 'romance',
+    'sci-fi': 'science fiction', 'sci fi': 'science fiction', 'scifi': 'science fiction',
+    'science fiction': 'science fiction', 'thriller': 'thriller', 'thrillers': 'thriller',
+    'war': 'war', 'western': 'western', 'westerns': 'western',
+}
+GENRE_WORD_REGEX = re.compile(r'\b(' + '|'.join(sorted(map(re.escape, GENRE_WORDS), key=len, reverse=True)) + r')\b')
+
+# A person's name runs until one of these words, punctuation, a number or the end
+NAME = r"([a-z][a-z.'-]*(?:\s+[a-z][a-z.'-]*){0,3}?)"
+NAME_END = (r"(?=\s+(?:from|in|of|released|made|and|or|with|starring|featuring|directed|by|"
+            r"before|after|since|during|around|please)\b|\s*[,.!?;]|\s+\d|$)")
+# First words showing a "with ..." phrase is not a name ("with a twist ending")
+NOT_NAME_WORDS = {'a', 'an', 'the', 'some', 'no', 'any', 'my', 'your', 'our', 'his', 'her', 'their',
+                  'me', 'us', 'him', 'them', 'friends', 'family', 'kids', 'children', 'lots', 'plenty'}
+# "with" also introduces things ("horror movies with zombies"), so only a
+# name the catalog knows counts after it; the other cues always name a person
+CAST_REGEX = re.compile(r'\b(with|starring|featuring)\s+' + NAME + NAME_END)
+DIRECTOR_REGEX = re.compile(r'\b(directed by|director)\s+' + NAME + NAME_END)
+WEAK_PERSON_CUES = {'with'}
+
+# Release years a message can ask for: spans, decades, recent years and
+# open-ended bounds, tried in that order before a single year
+YEAR = r'((?:18|19|20)\d{2})'
+EARLIEST_YEAR = 1800
+YEAR_SPAN_REGEX = re.compile(r'\bbetween\s+' + YEAR + r'\s+and\s+' + YEAR + r'\b|'
+                             r'\b' + YEAR + r'\s*(?:-|to|through|until)\s*' + YEAR + r'\b')
+DECADE_REGEX = re.compile(r"\b(1[89]|20)?(\d)0'?s\b")
+RECENT_YEARS_REGEX = re.compile(r'\b(?:last|past)\s+(\d{1,2})\s+years\b')
+YEAR_BOUND_REGEX = re.compile(r'\b(since|after|before)\s+' + YEAR + r'\b')
+PERSON_FIELDS = {'cast': CAST_REGEX, 'director': DIRECTOR_REGEX}
+
+# An intent pattern alternative, once its ".*" gaps are removed, is plain
+# words unless it still holds one of these
+REGEX_SYNTAX = re.compile(r'[\\.^$*+?{}\[\]()|]')
+GAP = re.compile(r'\.\*\??')
+
+
+def pattern_keyword(alternative):
+    """Longest literal piece of a pattern alternative made of words joined by .*, else None"""
+    pieces = GAP.split(alternative.replace("\\'", "'"))
+    if any(REGEX_SYNTAX.search(piece) for piece in pieces):
+        return None
+    return max(pieces, key=len) or None
+
+
+class ResponseCache:
+    """Formatted answers to the fixed queries, valid for one model generation.
+
+    Updates change the model in place, so answers are tied to its
+    generation (which every add, remove or refit renews), not to the object.
+    Answers are built outside the lock; one built for a generation that has
+    since been replaced is returned but not kept.
+    """
+
+    def __init__(self):
+        self.generation = None
+        self.responses = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, generation, key, build, *args):
+        with self.lock:
+            if generation != self.generation:
+                self.generation = generation
+                self.responses = {}
+            response = self.responses.get(key)
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if response is not None:
+            metrics.RESPONSE_CACHE_LOOKUPS.inc(key, 'hit')
+            return response
+        metrics.RESPONSE_CACHE_LOOKUPS.inc(key, 'miss')
+        response = build(*args)
+        with self.lock:
+            if generation == self.generation:
+                self.responses[key] = response
+        return response
+
+    def invalidate(self, generation=None):
+        with self.lock:
+            self.generation = generation
+            self.responses = {}
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.responses), 'hits': self.hits, 'misses': self.misses}
 
 class CompleteMovieExpert:
-    def __init__(self, recommender):
+    def __init__(self, recommender, sessions=None):
         self.recommender = recommender
         self.setup_intent_patterns()
         self.setup_responses()
-        self.conversation_history = []
+        # Conversation history per session id (see sessions.py for backends)
+        self.sessions = sessions if sessions is not None else MemorySessionStore()
+        self.response_cache = ResponseCache()
+        if recommender is not None:
+            self.warm_response_cache()
     
     def setup_intent_patterns(self):
         """Define patterns for ALL possible user intents"""
@@ -159,7 +283,9 @@ class CompleteMovieExpert:
             'year_movies': [
                 r'movies from|films from',
                 r'released in|year.*movie',
-                r'2023|2022|2021|2020'
+                r'2023|2022|2021|2020',
+                r"\b(?:1[89]|20)?\d0'?s\b|\bbetween (?:18|19|20)\d{2}|\b(?:18|19|20)\d{2} ?(?:-|to) ?(?:18|19|20)\d{2}\b",
+                r'\b(?:last|past) \d{1,2} years\b|\b(?:since|after|before) (?:18|19|20)\d{2}'
             ],
             'popular_movies': [
                 r'popular movies|trending films',
@@ -222,6 +348,60 @@ class CompleteMovieExpert:
                 r'মন ভালো|হাসিখুশি'
             ]
         }
+        
+        # Whole-message shortcuts, checked before any pattern
+        self.exact_matches = {
+            'action': 'action_movies',
+            'action movies': 'action_movies',
+            'romantic': 'romantic_movies',
+            'romance': 'romantic_movies',
+            'comedy': 'comedy_movies',
+            'horror': 'horror_movies',
+            'sci-fi': 'sci-fi_movies',
+            'drama': 'drama_movies',
+            'fantasy': 'fantasy_movies',
+            'animation': 'animation_movies',
+            'family': 'family_movies',
+            'documentary': 'documentary_movies',
+            'sad': 'sad_mood',
+            'happy': 'happy_mood',
+            'bored': 'bored_mood',
+            'stressed': 'stressed_mood',
+            'birthday': 'birthday',
+            'date': 'date_night'
+        }
+        
+        self.compile_intent_patterns()
+    
+    def compile_intent_patterns(self):
+        """Compile one regex per intent and a keyword prefilter in front of them.
+
+        Most pattern alternatives are words joined by ``.*``, so a message
+        can only match one if it contains that alternative's longest word
+        (see pattern_keyword). One scan of the message for every keyword
+        gives the candidate intents; intents with any other regex syntax are
+        always candidates. Only the candidates are then searched, in dict
+        order, so the first intent that matches still wins.
+        """
+        self.intent_names = list(self.intent_patterns)
+        self.intent_searches = [re.compile('|'.join(patterns)) for patterns in self.intent_patterns.values()]
+        self.unfiltered_intents = set()
+        keyword_intents = {}
+        for i, patterns in enumerate(self.intent_patterns.values()):
+            keywords = [pattern_keyword(alternative) for alternative in '|'.join(patterns).split('|')]
+            if None in keywords:
+                self.unfiltered_intents.add(i)
+                continue
+            for keyword in keywords:
+                keyword_intents.setdefault(keyword, set()).add(i)
+        # The scan reports the longest keyword starting at each position, so
+        # each keyword also stands for the shorter ones it starts with
+        self.keyword_intents = {
+            keyword: set().union(*(ids for other, ids in keyword_intents.items() if keyword.startswith(other)))
+            for keyword in keyword_intents
+        }
+        keywords = sorted(keyword_intents, key=len, reverse=True)
+        self.keyword_regex = re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
     
     def setup_responses(self):
         """Setup response templates for ALL scenarios"""
@@ -259,36 +439,17 @@ class CompleteMovieExpert:
         """Detect user intent from ANY input"""
         user_input_lower = user_input.lower().strip()
         
-        # First check for exact matches
-        exact_matches = {
-            'action': 'action_movies',
-            'action movies': 'action_movies',
-            'romantic': 'romantic_movies',
-            'romance': 'romantic_movies',
-            'comedy': 'comedy_movies',
-            'horror': 'horror_movies',
-            'sci-fi': 'sci-fi_movies',
-            'drama': 'drama_movies',
-            'fantasy': 'fantasy_movies',
-            'animation': 'animation_movies',
-            'family': 'family_movies',
-            'documentary': 'documentary_movies',
-            'sad': 'sad_mood',
-            'happy': 'happy_mood',
-            'bored': 'bored_mood',
-            'stressed': 'stressed_mood',
-            'birthday': 'birthday',
-            'date': 'date_night'
-        }
-        
-        if user_input_lower in exact_matches:
-            return exact_matches[user_input_lower], None
+        if user_input_lower in self.exact_matches:
+            return self.exact_matches[user_input_lower], None
         
-        # Then check pattern matches
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input_lower):
-                    return intent, re.search(pattern, user_input_lower)
+        # Then search the intents whose keywords the message contains
+        candidates = set(self.unfiltered_intents)
+        for keyword in self.keyword_regex.findall(user_input_lower):
+            candidates |= self.keyword_intents[keyword]
+        for i in sorted(candidates):
+            match = self.intent_searches[i].search(user_input_lower)
+            if match:
+                return self.intent_names[i], match
         
         return 'general_conversation', None
     
@@ -325,41 +486,211 @@ class CompleteMovieExpert:
         return None
     
     def extract_year(self, user_input):
-        """Extract year from user input"""
+        """The release years a message asks for as (first, last, phrase), or None.
+
+        Understands "between 2000 and 2010", "2000-2010", "the 90s",
+        "1980s", "last 5 years", "since / after / before 2015" and a
+        single year. The years are clamped to EARLIEST_YEAR and this year,
+        so first > last when no movie can match ("after 2099"); the phrase
+        describes what was asked ("from the 1990s", "since 1800").
+        """
+        text = user_input.lower()
+        this_year = datetime.now().year
+        match = YEAR_SPAN_REGEX.search(text)
+        if match:
+            first, last = sorted(int(year) for year in match.groups() if year)
+            return self.year_range(first, last, f'from {first} to {last}')
+        match = DECADE_REGEX.search(text)
+        if match:
+            century, decade = match.groups()
+            if century is None:
+                # Two-digit decades: the 20s are the 2020s, the 30s the 1930s
+                century = '20' if int(decade) * 10 <= this_year % 100 else '19'
+            first = int(century) * 100 + int(decade) * 10
+            return self.year_range(first, first + 9, f'from the {first}s')
+        match = RECENT_YEARS_REGEX.search(text)
+        if match:
+            count = max(int(match.group(1)), 1)
+            return self.year_range(this_year - count + 1, this_year, f'from the last {count} years')
+        match = YEAR_BOUND_REGEX.search(text)
+        if match:
+            word, year = match.group(1), int(match.group(2))
+            if word == 'before':
+                return self.year_range(EARLIEST_YEAR, year - 1, f'before {year}')
+            return self.year_range(year if word == 'since' else year + 1, this_year, f'{word} {year}')
         year_match = re.search(r'(19|20)\d{2}', user_input)
         if year_match:
-            return year_match.group()
+            year = int(year_match.group())
+            return self.year_range(year, year, f'from {year}')
         return None
     
-    def process_query(self, user_input):
+    def year_range(self, first, last, phrase):
+        """(first, last, phrase) with the years clamped to EARLIEST_YEAR and this year"""
+        return max(first, EARLIEST_YEAR), min(last, datetime.now().year), phrase
+    
+    def extract_constraints(self, user_input):
+        """Every filter a message asks for, as {field: values}.
+
+        Genres come from genre words anywhere in the message, the years
+        from extract_year (kept as its (first, last, phrase) triple), and
+        people from "with / starring ..." and "directed by ..." phrases.
+        After "with" only a name the field index holds counts; after an
+        explicit cue an unknown name is kept as typed, so the answer says
+        nothing matched rather than dropping that filter.
+        """
+        text = user_input.lower()
+        constraints = {}
+        genres = list(dict.fromkeys(GENRE_WORDS[word] for word in GENRE_WORD_REGEX.findall(text)))
+        if genres:
+            constraints['genres'] = genres
+        years = self.extract_year(user_input)
+        if years:
+            constraints['year'] = years
+        for field, regex in PERSON_FIELDS.items():
+            for match in regex.finditer(text):
+                cue, name = match.groups()
+                if name.split()[0] in NOT_NAME_WORDS:
+                    continue
+                weak = cue in WEAK_PERSON_CUES
+                person = self.known_person(field, name, substring=not weak)
+                if person or not weak:
+                    constraints[field] = [person or name]
+                    break
+        return constraints
+    
+    def known_person(self, field, name, substring=True):
+        """The longest leading words of name the field's index holds, else name if it matches as a substring.
+
+        substring=False skips that fallback, so only whole index tokens count.
+        """
+        index = self.recommender.field_indexes[field]
+        words = name.split()
+        for n in range(len(words), 0, -1):
+            token = ''.join(words[:n])
+            if len(token) >= 3 and token in index.token_ids:
+                return ' '.join(words[:n])
+        if not substring:
+            return None
+        token = ''.join(words)
+        return name if len(token) >= 3 and index.term_ids([token]) else None
+    
+    def process_query(self, user_input, session_id=None):
         """Main NLP processing - handles ALL question types"""
-        user_input_lower = user_input.lower().strip()
-        
         # Store conversation history
-        self.conversation_history.append(f"User: {user_input}")
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
+        if session_id is not None:
+            self.sessions.append(session_id, f"User: {user_input}")
+        
+        start = time.perf_counter()
+        with metrics.stage('detect_intent'):
+            intent = self.detect_intent(user_input)[0]
+        
+        logger.debug("User: %r | Intent: %s", user_input, intent)
+        
+        response = self.respond(user_input, intent, self.session_profile(session_id))
+        if session_id is not None and intent == 'similar_movies':
+            self.remember_title(session_id, self.extract_movie_title(user_input))
+        metrics.CHAT_REQUESTS.inc(intent)
+        metrics.CHAT_SECONDS.observe(intent, value=time.perf_counter() - start)
+        return response
+    
+    def process_queries(self, messages, session_id=None):
+        """Answer a batch of messages, in input order.
+
+        Identical messages are answered once, and all similar-movie
+        requests in the batch are resolved together with one
+        similar_ids_for_titles call. Each message is recorded in the chat
+        latency histogram with its share of that work.
+        """
+        if session_id is not None:
+            for message in messages:
+                self.sessions.append(session_id, f"User: {message}")
+        
+        profile = self.session_profile(session_id)
+        answers = {}
+        similar = {}
+        counts = {}
+        intents = {}
+        seconds = {}
+        for message in messages:
+            counts[message] = counts.get(message, 0) + 1
+        for message, count in counts.items():
+            start = time.perf_counter()
+            with metrics.stage('detect_intent'):
+                intent = self.detect_intent(message)[0]
+            intents[message] = intent
+            metrics.CHAT_REQUESTS.inc(intent, amount=count)
+            movie_title = self.extract_movie_title(message) if intent == 'similar_movies' else None
+            if movie_title:
+                similar[message] = movie_title
+            else:
+                answers[message] = self.respond(message, intent, profile)
+            seconds[message] = time.perf_counter() - start
         
-        intent, match = self.detect_intent(user_input)
+        if similar:
+            start = time.perf_counter()
+            titles = list(dict.fromkeys(similar.values()))
+            try:
+                # Only the pre-rendered entries are needed, not result frames
+                found = dict(zip(titles, self.recommender.similar_ids_for_titles(titles)))
+                for message, movie_title in similar.items():
+                    ids = found[movie_title]
+                    movies = NOT_FOUND.format(title=movie_title) if ids is None else self.format_ids(ids)
+                    answers[message] = self.similar_movies_response(movie_title, movies)
+            except Exception:
+                for message, movie_title in similar.items():
+                    answers[message] = self.get_similar_movies(movie_title)
+            if session_id is not None:
+                for movie_title in titles:
+                    self.remember_title(session_id, movie_title)
+            shared = (time.perf_counter() - start) / len(similar)
+            for message in similar:
+                seconds[message] += shared
         
-        print(f"DEBUG: User: '{user_input}' | Intent: {intent}")  # For debugging
+        for message, count in counts.items():
+            for _ in range(count):
+                metrics.CHAT_SECONDS.observe(intents[message], value=seconds[message] / count)
+        return [answers[message] for message in messages]
+    
+    def session_profile(self, session_id):
+        """Profile vector of the movies a session asked about or clicked (None if none)"""
+        if session_id is None:
+            return None
+        with metrics.stage('session_profile'):
+            return self.recommender.profile_vector(self.sessions.rows(session_id))
+    
+    def remember_title(self, session_id, movie_title):
+        """Add a movie the session asked about or clicked to its profile; False if unknown"""
+        idx = self.recommender.titles.resolve(movie_title) if movie_title else None
+        if idx is None:
+            return False
+        self.sessions.add_rows(session_id, [idx])
+        return True
+    
+    @metrics.timed('respond')
+    def respond(self, user_input, intent, profile=None):
+        """Answer a message whose intent is already detected.
+
+        Lists built from the charts or the field indexes are re-ranked
+        toward ``profile`` (see session_profile) when one is given.
+        """
+        #  Handle requests combining several filters ("comedy from 2005 with Jim Carrey")
+        if intent != 'similar_movies':
+            with metrics.stage('extract_constraints'):
+                constraints = self.extract_constraints(user_input)
+            if len(constraints) > 1:
+                return self.get_filtered_movies(constraints, profile)
         
         #  Handle ALL movie genre requests
-        if any(intent == genre for genre in ['action_movies', 'romantic_movies', 'comedy_movies', 
-                                           'horror_movies', 'sci-fi_movies', 'drama_movies',
-                                           'fantasy_movies', 'animation_movies', 'family_movies',
-                                           'documentary_movies']):
-            return self.handle_genre_request(intent)
+        if intent in GENRE_INTENTS:
+            return self.cached_response(intent, self.handle_genre_request, intent, profile=profile)
         
         #  Handle ALL mood-based requests
-        elif any(intent == mood for mood in ['sad_mood', 'happy_mood', 'bored_mood', 'stressed_mood',
-                                           'romantic_mood', 'energetic_mood', 'relaxed_mood']):
-            return self.handle_mood_request(intent)
+        elif intent in MOOD_INTENTS:
+            return self.cached_response(intent, self.handle_mood_request, intent, profile=profile)
         
         #  Handle ALL special occasions
-        elif any(intent == occasion for occasion in ['birthday', 'date_night', 'friends_hangout',
-                                                   'family_time', 'alone_time']):
-            return self.handle_occasion_request(intent)
+        elif intent in OCCASION_INTENTS:
+            return self.cached_response(intent, self.handle_occasion_request, intent, profile=profile)
         
         #  Handle search-based requests
         elif intent == 'similar_movies':
@@ -372,22 +703,22 @@ class CompleteMovieExpert:
         elif intent == 'actor_movies' or intent == 'director_movies':
             name = self.extract_actor_director(user_input)
             if name:
-                return self.get_movies_by_person(name, 'actor' if intent == 'actor_movies' else 'director')
+                return self.get_movies_by_person(name, 'actor' if intent == 'actor_movies' else 'director', profile)
             else:
                 return "Which actor or director are you interested in? Try: 'movies with Tom Cruise'"
         
         elif intent == 'year_movies':
-            year = self.extract_year(user_input)
-            if year:
-                return self.get_movies_by_year(year)
+            years = self.extract_year(user_input)
+            if years:
+                return self.get_movies_by_year(years, profile)
             else:
                 return "Which year are you interested in? Try: 'movies from 2020'"
         
         elif intent == 'popular_movies':
-            return self.get_popular_movies()
+            return self.cached_response(intent, self.get_popular_movies, profile=profile)
         
         elif intent == 'award_movies':
-            return self.get_award_winning_movies()
+            return self.cached_response(intent, self.get_award_winning_movies, profile=profile)
     
         #  Handle general conversation
         elif intent == 'greeting':
@@ -427,9 +758,34 @@ class CompleteMovieExpert:
         
         # Default: Handle any other query
         else:
-            return self.handle_unknown_query(user_input)
+            return self.handle_unknown_query(user_input, profile)
+    
+    def conversation_history(self, session_id):
+        """The last messages of one session, oldest first"""
+        return self.sessions.history(session_id)
+    
+    def cached_response(self, key, build, *args, profile=None):
+        """Answer a fixed query from the response cache, building it on a miss.
+
+        Personalized answers differ per session, so they bypass the cache.
+        """
+        if profile is not None:
+            return build(*args, profile=profile)
+        return self.response_cache.get(self.recommender.generation, key, build, *args)
     
-    def handle_genre_request(self, genre_intent):
+    def warm_response_cache(self):
+        """Precompute the answers to every fixed genre/mood/occasion/chart query"""
+        self.response_cache.invalidate(self.recommender.generation)
+        for intent in GENRE_INTENTS:
+            self.cached_response(intent, self.handle_genre_request, intent)
+        for intent in MOOD_INTENTS:
+            self.cached_response(intent, self.handle_mood_request, intent)
+        for intent in OCCASION_INTENTS:
+            self.cached_response(intent, self.handle_occasion_request, intent)
+        self.cached_response('popular_movies', self.get_popular_movies)
+        self.cached_response('award_movies', self.get_award_winning_movies)
+    
+    def handle_genre_request(self, genre_intent, profile=None):
         """Handle any genre request"""
         genre_map = {
             'action_movies': 'action',
@@ -445,7 +801,7 @@ class CompleteMovieExpert:
         }
         
         genre = genre_map.get(genre_intent, 'action')
-        movies = self.recommender.recommend_by_genre(genre)
+        movies = self.recommender.recommend_by_genre(genre, profile=profile)
         
         if isinstance(movies, pd.DataFrame) and len(movies) > 0:
             response = self.response_templates.get(genre_intent, f"**{genre.title()} Movie Recommendations!** \n\n")
@@ -453,7 +809,7 @@ class CompleteMovieExpert:
         else:
             return f"I couldn't find any {genre} movies. Try another genre!"
     
-    def handle_mood_request(self, mood_intent):
+    def handle_mood_request(self, mood_intent, profile=None):
         """Handle any mood request"""
         mood_map = {
             'sad_mood': 'happy',
@@ -466,15 +822,15 @@ class CompleteMovieExpert:
         }
         
         target_mood = mood_map.get(mood_intent, 'comedy')
-        movies = self.recommender.recommend_by_mood(target_mood)
+        movies = self.recommender.recommend_by_mood(target_mood, profile=profile)
         
         if isinstance(movies, pd.DataFrame) and len(movies) > 0:
             response = self.response_templates.get(mood_intent, "**Perfect Movies for Your Mood!** \n\n")
             return response + self.format_movie_list(movies)
         else:
-            return "Let me recommend some popular movies for you!\n\n" + self.get_popular_movies()
+            return "Let me recommend some popular movies for you!\n\n" + self.get_popular_movies(profile)
     
-    def handle_occasion_request(self, occasion_intent):
+    def handle_occasion_request(self, occasion_intent, profile=None):
         """Handle any special occasion request"""
         occasion_map = {
             'birthday': ['comedy', 'animation', 'musical'],
@@ -485,65 +841,112 @@ class CompleteMovieExpert:
         }
         
         target_genres = occasion_map.get(occasion_intent, ['comedy'])
-        movies = self.recommender.combined_df[
-            self.recommender.combined_df['genres_clean'].str.contains('|'.join(target_genres), na=False)
-        ]
+        movies = self.recommender.find_movies('genres', target_genres, 8, profile)
         
         if len(movies) > 0:
-            top_movies = movies.nlargest(8, ['vote_average', 'popularity'])
+            top_movies = self.recommender.movie_rows(movies)
             response = self.response_templates.get(occasion_intent, f"**Perfect Movies for Your Occasion!** \n\n")
             return response + self.format_movie_list(top_movies)
         else:
-            return self.get_popular_movies()
+            return self.get_popular_movies(profile)
     
     def get_similar_movies(self, movie_title):
         """Get movies similar to given title"""
         try:
-            similar_movies = self.recommender.get_recommendations(movie_title)
-            if isinstance(similar_movies, pd.DataFrame):
-                return f"**Movies similar to '{movie_title}'** \n\n{self.format_movie_list(similar_movies)}"
-            else:
-                return f"**Movies similar to '{movie_title}'** \n\n{similar_movies}"
+            with metrics.stage('resolve_title'):
+                idx = self.recommender.titles.resolve(movie_title)
+            if idx is None:
+                return self.similar_movies_response(movie_title, NOT_FOUND.format(title=movie_title))
+            movie_id = self.recommender.combined_df['id'].iat[idx]
+            movies = self.movie_list('similar', movie_id, lambda: self.recommender.similar_ids(idx, 10))
+            return self.similar_movies_response(movie_title, movies or self.format_ids([]))
         except:
             return f"Sorry, I couldn't find movies similar to '{movie_title}'. Try another movie title!"
     
-    def get_movies_by_person(self, name, person_type):
+    def similar_movies_response(self, movie_title, similar_movies):
+        """Format a get_recommendations result (frame, or an already formatted string)"""
+        if isinstance(similar_movies, pd.DataFrame):
+            return f"**Movies similar to '{movie_title}'** \n\n{self.format_movie_list(similar_movies)}"
+        else:
+            return f"**Movies similar to '{movie_title}'** \n\n{similar_movies}"
+    
+    def get_movies_by_person(self, name, person_type, profile=None):
         """Get movies by actor or director"""
-        if person_type == 'actor':
-            movies = self.recommender.combined_df[
-                self.recommender.combined_df['top_cast'].str.contains(name.lower().replace(' ', ''), na=False)
-            ]
-        else:  # director
-            movies = self.recommender.combined_df[
-                self.recommender.combined_df['director'].str.contains(name.lower().replace(' ', ''), na=False)
-            ]
+        field = 'cast' if person_type == 'actor' else 'director'
+        token = name.lower().replace(' ', '')
+        movies = self.movie_list(field, token, lambda: self.recommender.find_movies(field, [token], 8, profile), profile)
         
-        if len(movies) > 0:
-            top_movies = movies.nlargest(8, ['vote_average', 'popularity'])
-            return f"**{person_type.title()} {name}'s Movies** \n\n{self.format_movie_list(top_movies)}"
+        if movies:
+            return f"**{person_type.title()} {name}'s Movies** \n\n{movies}"
         else:
             return f"Sorry, I couldn't find any movies with {person_type} {name}."
     
-    def get_movies_by_year(self, year):
-        """Get movies from specific year"""
-        movies = self.recommender.combined_df[
-            self.recommender.combined_df['release_date'].str.contains(year, na=False)
-        ]
+    def get_movies_by_year(self, years, profile=None):
+        """Get movies released in a range of years, as extract_year gives it"""
+        first, last, when = years
+        movies = self.movie_list('year', f'{first}-{last}',
+                                 lambda: self.recommender.find_movies_released(first, last, 8, profile), profile)
+        
+        if movies:
+            return f"**Movies {when}** \n\n{movies}"
+        else:
+            return f"Sorry, I couldn't find any movies {when}."
+    
+    def movie_list(self, kind, argument, find, profile=None):
+        """Formatted list of the row ids find() returns ('' if none).
+
+        Lists are kept in the recommender's result cache under the query
+        kind and its resolved argument, so a repeated query skips both the
+        lookup and the formatting; personalized lists are never cached.
+        """
+        def build():
+            ids = find()
+            return (self.format_ids(ids) if len(ids) else '').encode()
+        if profile is not None:
+            return build().decode()
+        return self.recommender.cached(kind, argument, build).decode()
+    
+    def get_filtered_movies(self, constraints, profile=None):
+        """Get movies matching every extracted constraint"""
+        for field, person_type in (('cast', 'actor'), ('director', 'director')):
+            if field in constraints and not self.known_person(field, constraints[field][0]):
+                return f"Sorry, I couldn't find any movies with {person_type} {constraints[field][0].title()}."
+        terms = {
+            field: [value.replace(' ', '') for value in values] if field in PERSON_FIELDS else values
+            for field, values in constraints.items()
+        }
+        if 'year' in constraints:
+            first, last, _ = constraints['year']
+            terms['year'] = [str(year) for year in range(first, last + 1)]
+        # A range no movie can fall in ("before 1800") answers nothing
+        movies = self.recommender.find_movies_matching(terms, 8, profile) if all(terms.values()) else []
+        description = self.describe_constraints(constraints)
         
         if len(movies) > 0:
-            top_movies = movies.nlargest(8, ['vote_average', 'popularity'])
-            return f"**Movies from {year}** \n\n{self.format_movie_list(top_movies)}"
+            return f"**{description}** \n\n{self.format_ids(movies)}"
         else:
-            return f"Sorry, I couldn't find any movies from {year}."
+            return f"Sorry, I couldn't find any {description[0].lower() + description[1:]}."
+    
+    def describe_constraints(self, constraints):
+        """Title like 'Comedy movies from 2005 with Jim Carrey'"""
+        genres = ' / '.join(genre.title() for genre in constraints.get('genres', []))
+        parts = [f'{genres} movies' if genres else 'Movies']
+        if 'year' in constraints:
+            parts.append(constraints['year'][2])
+        if 'cast' in constraints:
+            parts.append(f"with {constraints['cast'][0].title()}")
+        if 'director' in constraints:
+            parts.append(f"directed by {constraints['director'][0].title()}")
+        return ' '.join(parts)
     
-    def get_popular_movies(self):
+    def get_popular_movies(self, profile=None):
         """Get popular movies"""
-        popular = self.recommender.get_popular_movies(10)
+        popular = self.recommender.get_popular_movies(10, profile)
         return "**Most Popular Movies Right Now!** \n\n" + self.format_movie_list(popular)
     
-    def get_award_winning_movies(self):
+    def get_award_winning_movies(self, profile=None):
         """Get award-winning movies"""
-        award_movies = self.recommender.combined_df.nlargest(8, 'vote_average')
+        award_movies = self.recommender.get_top_rated_movies(8, profile)
         return "**Award-Winning & Highly Rated Movies!** \n\n" + self.format_movie_list(award_movies)
     
     def handle_bengali_request(self, intent, user_input):
@@ -557,12 +960,18 @@ class CompleteMovieExpert:
         else:
             return "আমি আপনার সিনেমা বিশেষজ্ঞ! আপনি কি ধরনের সিনেমা দেখতে চান?"
     
-    def handle_unknown_query(self, user_input):
+    def handle_unknown_query(self, user_input, profile=None):
         """Handle any unknown query intelligently"""
+        # Treat the message as a description of the movie wanted
+        description = DESCRIPTION_FILLER.sub(' ', user_input.lower())
+        movies = self.recommender.recommend_by_description(description, 8)
+        if len(movies) > 0:
+            return f"**Movies matching '{user_input.strip()}'** \n\n{self.format_movie_list(movies)}"
+        
         # Check if it's movie-related
         movie_keywords = ['movie', 'film', 'watch', 'see', 'cinema', 'theater']
         if any(keyword in user_input.lower() for keyword in movie_keywords):
-            return self.get_popular_movies()
+            return self.cached_response('popular_movies', self.get_popular_movies, profile=profile)
         
         # Default helpful response
         return self.get_help_response()
@@ -572,26 +981,16 @@ class CompleteMovieExpert:
         if isinstance(movies, str):
             return movies
         
-        if len(movies) == 0:
+        return self.format_ids(movies.index)
+    
+    @metrics.timed('format')
+    def format_ids(self, ids):
+        """Numbered list of the pre-rendered entries for row ids"""
+        if len(ids) == 0:
             return "No movies found matching your criteria."
         
-        response = ""
-        for i, (_, movie) in enumerate(movies.iterrows(), 1):
-            response += f"{i}. **{movie['title']}** ⭐ {movie['vote_average']}/10\n"
-            response += f"   🎭 {self.extract_genres(movie['genres'])}\n"
-            response += f"   📅 {movie['release_date']}\n"
-            response += f"   📖 {movie['overview'][:100]}...\n\n"
-        
-        return response
-    
-    def extract_genres(self, genres_str):
-        """Extract genre names from genres string"""
-        try:
-            import ast
-            genres_list = ast.literal_eval(genres_str)
-            return ', '.join([genre['name'] for genre in genres_list])
-        except:
-            return 'Various Genres'
+        entries = self.recommender.display_text(ids)
+        return ''.join([f"{i}. {entry}" for i, entry in enumerate(entries, 1)])
     
     def get_help_response(self):
         """Comprehensive help response"""
@@ -1,65 +1,609 @@
 import pandas as pd
 import numpy as np
-import ast
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import logging
+import threading
+import uuid
 import warnings
+import ann
+import artifact
+import ingest
+import metrics
+from fulltext import TextIndex
+from hashed_tfidf import HashedTfidfVectorizer
+from indexes import PostingIndex, TokenLists, rank_order, top_k, union
+from title_index import TitleResolver
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Number of precomputed neighbors kept per movie, and how many rows are
+# scored at once while building them (bounds the dense scratch block).
+NEIGHBOR_K = 50
+NEIGHBOR_BLOCK = 256
+
+# Similarity engines: 'exact' scores the full TF-IDF matrix, 'ann' serves
+# neighbors from an IVF index over dense embeddings (see ann.py)
+ENGINES = ('exact', 'ann')
+
+TFIDF_PARAMS = {
+    'stop_words': 'english',
+    'max_features': 5000,
+    'ngram_range': (1, 2),
+}
+
+# Parsed columns the serving path and a refit need, in text form; a model
+# keeps them compacted (FRAME_COLUMNS plus token fields), and expand_frame
+# restores them, so a model can be refitted (and updated) without the CSVs.
+SERVING_COLUMNS = [
+    'id', 'title', 'genres', 'overview', 'vote_average', 'popularity',
+    'release_date', 'genres_clean', 'top_cast', 'director', 'display',
+    'genre_names', 'keywords_clean'
+]
+
+# The frame a model keeps: the serving columns without the multi-valued
+# text fields, which are held as TokenLists instead (see compact_frame)
+FRAME_COLUMNS = ['id', 'title', 'genres', 'overview', 'vote_average', 'popularity',
+                 'release_date', 'director', 'display']
+
+# Compact dtypes of frame columns; the few distinct genre lists and
+# directors are stored once each as categories. vote_average stays
+# float64: it is shown to users, where float32 would print 4.8 as
+# 4.800000190734863
+COLUMN_DTYPES = {
+    'id': np.int32, 'popularity': np.float32,
+    'genres': 'category', 'director': 'category',
+}
+
+# Text columns emptied for removed movies when a model is refitted
+BLANKED_COLUMNS = ['title', 'overview', 'genre_names', 'genres_clean', 'keywords_clean',
+                   'top_cast', 'director', 'release_date']
+
+# Columns of the result frames handed to the chat layer
+DISPLAY_COLUMNS = ['title', 'genres', 'vote_average', 'release_date', 'overview']
+
+# Share of the free-text ranking score given to (log) popularity
+POPULARITY_BLEND = 0.2
+
+# Personalized lists re-rank this many times top_n candidates, giving the
+# share PROFILE_BLEND of the score to similarity with the session profile
+PROFILE_POOL = 5
+PROFILE_BLEND = 0.5
+
+NOT_FOUND = "Movie '{title}' not found. Please check the spelling."
+
+# Bulky text columns kept in the memory-mapped artifact in shared mode
+SHARED_TEXT_COLUMNS = ('overview', 'display')
+
+def render_display(df):
+    """Each movie's entry in a chat response list, as one string per row"""
+    genres = [
+        names.replace('|', ', ') if isinstance(names, str) else 'Various Genres'
+        for names in df['genre_names'].astype(object)
+    ]
+    return [
+        f"**{title}** ⭐ {rating}/10\n"
+        f"   🎭 {genre}\n"
+        f"   📅 {date}\n"
+        f"   📖 {overview[:100]}...\n\n"
+        for title, rating, genre, date, overview in zip(
+            df['title'].astype(object), df['vote_average'].astype(object), genres,
+            df['release_date'].astype(object), df['overview']
+        )
+    ]
+
+def prepare_rows(movies, credits=None):
+    """Parse rows in the movies.csv (and credits.csv) schema like the CSV loaders do"""
+    movies = ingest.process_movies_chunk(pd.DataFrame(movies))
+    if credits is None:
+        credits = pd.DataFrame({'movie_id': pd.Series(dtype=np.int64),
+                                'top_cast': pd.Series(dtype=object), 'director': pd.Series(dtype=object)})
+    else:
+        credits = ingest.process_credits_chunk(pd.DataFrame(credits))
+    rows = movies.merge(credits, left_on='id', right_on='movie_id', how='left').reset_index(drop=True)
+    rows['display'] = render_display(rows)
+    rows['combined_features'] = feature_text(rows)
+    return rows
+
+def split_fields(df):
+    """Token lists per row of the multi-valued fields, from their text columns"""
+    def split(column):
+        return df[column].fillna('').str.split()
+
+    return {
+        'genres': df['genre_names'].fillna('').str.lower().str.split('|'),
+        'keywords': split('keywords_clean'),
+        'cast': split('top_cast'),
+    }
+
+def field_tokens(df, token_fields=None):
+    """Token lists per row for each filterable field.
+
+    The multi-valued fields are read from ``token_fields`` (TokenLists)
+    when given, otherwise split from the text columns.
+    """
+    if token_fields is None:
+        tokens = split_fields(df)
+    else:
+        tokens = {field: table.lists() for field, table in token_fields.items()}
+    tokens['director'] = [[name] for name in df['director'].astype(object).fillna('')]
+    tokens['year'] = [[date[:4]] for date in df['release_date'].fillna('')]
+    return tokens
+
+def release_days(dates):
+    """Release dates as int32 YYYYMMDD (missing month or day as 00, no year as 0)"""
+    dates = pd.Series(dates).astype(object).fillna('').astype(str)
+    parts = [pd.to_numeric(dates.str[a:b], errors='coerce') for a, b in ((0, 4), (5, 7), (8, 10))]
+    year, month, day = parts[0].fillna(0), parts[1].fillna(0), parts[2].fillna(0)
+    return (year * 10000 + month * 100 + day).to_numpy(dtype=np.int32)
+
+def compact_frame(df):
+    """The frame columns of df in their compact dtypes"""
+    frame = df[FRAME_COLUMNS].reset_index(drop=True)
+    frame['director'] = frame['director'].astype(object).fillna('')
+    dtypes = dict(COLUMN_DTYPES)
+    if len(frame) and frame['id'].max() > np.iinfo(np.int32).max:
+        dtypes['id'] = np.int64
+    return frame.astype(dtypes)
+
+def expand_frame(frame, token_fields):
+    """The serving columns in text form (as prepare_rows makes them) from a compact frame"""
+    genres = token_fields['genres'].lists()
+    text = frame.astype({column: object for column, dtype in COLUMN_DTYPES.items() if dtype == 'category'})
+    return text.assign(
+        genre_names=['|'.join(names) for names in genres],
+        genres_clean=[' '.join(names) for names in genres],
+        keywords_clean=token_fields['keywords'].joined(),
+        top_cast=token_fields['cast'].joined(),
+    )[SERVING_COLUMNS]
+
+def search_frame(frame, token_fields, start=0):
+    """The columns the full-text index reads, for rows start, start + 1, ..."""
+    return pd.DataFrame({
+        'title': frame['title'].iloc[start:].to_numpy(dtype=object),
+        'overview': frame['overview'].iloc[start:].to_numpy(dtype=object),
+        'keywords_clean': token_fields['keywords'].joined(start=start),
+    })
+
+def column_memory(frame, token_fields=None, text_tables=None):
+    """Bytes held by each column (strings included), token field and text table"""
+    usage = frame.memory_usage(index=False, deep=True)
+    for field, table in (token_fields or {}).items():
+        usage[f'{field} (tokens)'] = table.nbytes()
+    for column, table in (text_tables or {}).items():
+        usage[column] = table.offsets.nbytes + table.buffer.nbytes + table.nulls.nbytes
+    return usage
+
+def order_by(df, column):
+    """Row ids sorted by column, descending; ties keep row order like nlargest"""
+    values = df[column].fillna(-np.inf).to_numpy(dtype=np.float64)
+    return np.lexsort((np.arange(len(values)), -values)).astype(np.int32)
+
+def row_entries(matrix, rows):
+    """Which of rows each stored entry of rows belongs to, and the entries' positions in a CSR matrix"""
+    starts = np.asarray(matrix.indptr)[rows]
+    lengths = np.asarray(matrix.indptr)[np.asarray(rows) + 1] - starts
+    ends = np.cumsum(lengths)
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    return owners, np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - ends + lengths, lengths)
+
+def replace_rows(table, n, updates):
+    """A CSR neighbor table grown to n rows, with the rows in updates ({row: (ids, scores)}) replaced"""
+    old_n = table.shape[0]
+    changed = np.fromiter(updates, dtype=np.int64, count=len(updates))
+    counts = np.zeros(n, dtype=np.int64)
+    counts[:old_n] = np.diff(table.indptr)
+    counts[changed] = [len(ids) for ids, _ in updates.values()]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    cols = np.empty(indptr[-1], dtype=np.int32)
+    vals = np.empty(indptr[-1], dtype=np.float32)
+
+    # Unchanged rows are copied over in one gather, keeping their order
+    unchanged = np.ones(old_n, dtype=bool)
+    unchanged[changed[changed < old_n]] = False
+    entry_rows = np.repeat(np.arange(old_n), np.diff(table.indptr))
+    keep = np.flatnonzero(unchanged[entry_rows])
+    kept_rows = entry_rows[keep]
+    destination = indptr[kept_rows] + keep - table.indptr[kept_rows]
+    cols[destination] = table.indices[keep]
+    vals[destination] = table.data[keep]
+    for row, (ids, scores) in updates.items():
+        cols[indptr[row]:indptr[row + 1]] = ids
+        vals[indptr[row]:indptr[row + 1]] = scores
+    return csr_matrix((vals, cols, indptr), shape=(n, n))
+
+def feature_text(df):
+    """The text TF-IDF is fitted on: overview, genres, keywords, cast, director"""
+    return (
+        df['overview'].fillna('') + ' ' +
+        df['genres_clean'] + ' ' +
+        df['keywords_clean'] + ' ' +
+        df['top_cast'].fillna('') + ' ' +
+        df['director'].fillna('')
+    )
+
 class MovieRecommender:
-    def __init__(self, movies_path, credits_path):
-        self.movies_df = pd.read_csv(movies_path)
-        self.credits_df = pd.read_csv(credits_path)
+    def __init__(self, movies_path, credits_path, neighbor_k=NEIGHBOR_K, workers=None,
+                 streaming=False, chunksize=ingest.CHUNK_SIZE, engine='exact'):
+        self.setup({'movies': movies_path, 'credits': credits_path}, neighbor_k, engine)
+        metrics.MODEL_LOAD_SECONDS.reset()
+        
+        if streaming:
+            self.stream_features(movies_path, credits_path, chunksize)
+        else:
+            # JSON columns are parsed while reading, chunk by chunk
+            self.movies_df = ingest.load_movies(movies_path, chunksize, workers)
+            self.credits_df = ingest.load_credits(credits_path, chunksize, workers)
+            with metrics.load_phase('merge'):
+                self.preprocess_data()
+            with metrics.load_phase('display'):
+                self.build_display_text()
+            with metrics.load_phase('tfidf_fit'):
+                self.fit_features()
+        with metrics.load_phase('compact'):
+            self.compact()
+        self.removed = np.zeros(len(self.combined_df), dtype=bool)
+        with metrics.load_phase('similarity'):
+            self.create_similarity_matrix()
+        with metrics.load_phase('indexes'):
+            self.build_field_indexes()
+            self.build_text_index()
+            self.build_date_index()
+
+    def setup(self, sources, neighbor_k, engine):
+        """Initialize the attributes every model has, however it was made"""
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'; use one of {', '.join(ENGINES)}")
+        self.movies_df = None
+        self.credits_df = None
         self.combined_df = None
         self.tfidf_matrix = None
-        self.cosine_sim = None
-        self.indices = None
-        
-        self.preprocess_data()
-        self.create_similarity_matrix()
+        self.neighbors = None
+        self.neighbor_k = neighbor_k
+        self.engine = engine
+        self.ann = None
+        self.titles = None
+        self.rank_order = None
+        # Rows with a release date sorted by it, their dates, and the rank
+        # position of every row (see find_movies_released)
+        self.date_order = None
+        self.dates_sorted = None
+        self.rank_positions = None
+        self.token_fields = {}
+        self.field_indexes = {}
+        self.text_index = None
+        self.text_tables = {}
+        self.sources = sources
+        # Per-column memory of the frame compact() was given
+        self.memory_before = None
+        # Movies added since the text index was built are searched in a
+        # second, small index whose document ids start at text_delta_start
+        self.text_delta = None
+        self.text_delta_start = 0
+        # Removed movies keep their row ids as tombstones (see remove_movies)
+        self.removed = None
+        self.removed_count = 0
+        # Updates applied since the last build or refit, replayed by refit()
+        self.changes = []
+        self.update_lock = threading.Lock()
+        # Optional result cache (see result_cache.py); its keys start with
+        # the generation, which changes with every update to the catalog
+        self.result_cache = None
+        self.generation = uuid.uuid4().hex[:16]
+
+    @classmethod
+    def build(cls, movies_path, credits_path, artifact_path=None, **options):
+        """Build the model from CSVs, optionally saving it as an artifact.
+
+        Options are passed to the constructor (neighbor_k, workers,
+        streaming, chunksize, engine).
+        """
+        recommender = cls(movies_path, credits_path, **options)
+        if artifact_path:
+            recommender.save(artifact_path)
+        return recommender
+
+    @classmethod
+    def load(cls, path, mmap=True, shared=False):
+        """Load a model artifact written by save(); arrays are memory-mapped.
+
+        With shared=True the bulky text columns are not decoded into the
+        frame either: they are read from the mapped files row by row, so
+        every worker process shares the same physical pages.
+        """
+        with metrics.load_phase('artifact_read'):
+            parts = artifact.read_artifact(path, mmap=mmap or shared,
+                                           tables=SHARED_TEXT_COLUMNS if shared else ())
+        recommender = cls.__new__(cls)
+        recommender.setup(None, parts['params']['neighbor_k'], parts['params']['engine'])
+        recommender.generation = parts['fingerprint']
+        recommender.combined_df = parts['frame']
+        recommender.token_fields = parts['token_fields']
+        recommender.text_tables = parts['tables']
+        recommender.tfidf_matrix = parts['matrices']['tfidf']
+        recommender.neighbors = parts['matrices']['neighbors']
+        recommender.removed = np.zeros(len(recommender.combined_df), dtype=bool)
+        recommender.ann = parts['ann']
+        recommender.rank_order = parts['arrays']['rank_order']
+        recommender.field_indexes = parts['indexes']
+        recommender.text_index = parts['text_index']
+
+        tfidf_params = dict(parts['params']['tfidf'], ngram_range=tuple(parts['params']['tfidf']['ngram_range']))
+        if tfidf_params.pop('hashing', False):
+            recommender.vectorizer = HashedTfidfVectorizer(**tfidf_params)
+            recommender.vectorizer.columns_ = parts['arrays']['tfidf_columns']
+        else:
+            recommender.vectorizer = TfidfVectorizer(**tfidf_params)
+            recommender.vectorizer.vocabulary_ = {term: i for i, term in enumerate(parts['vocabulary'])}
+        recommender.vectorizer.idf_ = parts['idf']
+
+        with metrics.load_phase('lookup_indexes'):
+            recommender.build_lookup_indexes()
+            recommender.build_date_index()
+        return recommender
+
+    @classmethod
+    def from_frame(cls, frame, removed=None, neighbor_k=NEIGHBOR_K, engine='exact', hashing=False):
+        """Fit a model on a frame of serving columns (see refit).
+
+        Rows flagged in ``removed`` keep their ids but are emptied, so they
+        never match a lookup or appear as anyone's neighbor.
+        """
+        recommender = cls.__new__(cls)
+        recommender.setup(None, neighbor_k, engine)
+        metrics.MODEL_LOAD_SECONDS.reset()
+        frame = frame[SERVING_COLUMNS].reset_index(drop=True)
+        recommender.removed = np.zeros(len(frame), dtype=bool) if removed is None else np.asarray(removed, dtype=bool)
+        if recommender.removed.any():
+            frame.loc[recommender.removed, BLANKED_COLUMNS] = ''
+        frame['combined_features'] = feature_text(frame)
+        recommender.combined_df = frame
+        recommender.removed_count = int(recommender.removed.sum())
+        with metrics.load_phase('tfidf_fit'):
+            recommender.fit_features(hashing)
+        with metrics.load_phase('compact'):
+            recommender.compact()
+        with metrics.load_phase('similarity'):
+            recommender.create_similarity_matrix()
+        with metrics.load_phase('indexes'):
+            recommender.build_field_indexes()
+            recommender.build_text_index()
+            recommender.build_date_index()
+        return recommender
+
+    @classmethod
+    def load_or_build(cls, movies_path, credits_path, artifact_path, shared=False, **options):
+        """Load the artifact if it matches the CSVs, otherwise rebuild and save it first"""
+        sources = {'movies': movies_path, 'credits': credits_path}
+        metrics.MODEL_LOAD_SECONDS.reset()
+        params = {'engine': options.get('engine', 'exact')}
+        if not artifact.is_fresh(artifact_path, sources, params):
+            with artifact.build_lock(artifact_path):
+                # Another process may have built it while we waited
+                if not artifact.is_fresh(artifact_path, sources, params):
+                    cls.build(movies_path, credits_path, artifact_path, **options)
+        return cls.load(artifact_path, shared=shared)
+
+    def save(self, path):
+        """Write the cleaned frame, TF-IDF model and neighbor table to path"""
+        if not self.sources:
+            raise ValueError("Only a model built from CSV files can be saved.")
+        arrays = {'rank_order': self.rank_order}
+        if isinstance(self.vectorizer, HashedTfidfVectorizer):
+            vocabulary = []
+            tfidf_params = self.vectorizer.get_params()
+            arrays['tfidf_columns'] = self.vectorizer.columns_
+        else:
+            vocabulary = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+            tfidf_params = TFIDF_PARAMS
+        with metrics.load_phase('artifact_write'):
+            artifact.write_artifact(path, {
+                'frame': self.combined_df[FRAME_COLUMNS],
+                'token_fields': self.token_fields,
+                'matrices': {'tfidf': self.tfidf_matrix, 'neighbors': self.neighbors},
+                'arrays': arrays,
+                'indexes': self.field_indexes,
+                'text_index': self.text_index,
+                'ann': self.ann,
+                'vocabulary': vocabulary,
+                'idf': self.vectorizer.idf_,
+                'params': {'neighbor_k': self.neighbor_k, 'tfidf': tfidf_params, 'engine': self.engine},
+            }, artifact.describe_sources(self.sources))
     
+    def add_movies(self, movies, credits=None):
+        """Add movies given as rows in the movies.csv schema (and credits.csv rows).
+
+        New rows are transformed with the fitted vocabulary and appended to
+        the TF-IDF matrix and indexes. Only their own neighbor lists and the
+        lists they now rank in are updated; a movie whose id is already in
+        the catalog replaces it. Returns the new row ids.
+        """
+        rows = prepare_rows(movies, credits)
+        with self.update_lock:
+            added = self.apply_change('add', rows)
+            self.changes.append(('add', rows))
+        return added
+
+    def remove_movies(self, ids):
+        """Remove movies by TMDB id; returns the row ids that were removed.
+
+        Row ids are never reused or shifted: removed movies stay as
+        tombstones that no lookup returns, so a request racing an update
+        still reads valid rows.
+        """
+        with self.update_lock:
+            rows = self.apply_change('remove', self.rows_for_ids(ids))
+            self.changes.append(('remove', rows))
+        return rows
+
+    def apply_change(self, kind, payload):
+        if kind == 'add':
+            self.remove_rows(self.rows_for_ids(payload['id']))
+            return self.append_rows(payload)
+        self.remove_rows(payload)
+        return payload
+
+    def rows_for_ids(self, ids):
+        """Row ids of the catalog movies with these TMDB ids"""
+        movie_ids = self.combined_df['id'].to_numpy()
+        return np.flatnonzero(np.isin(movie_ids, np.asarray(list(ids), dtype=movie_ids.dtype)) & ~self.removed)
+
+    def live_frame(self):
+        """The frame columns, with memory-mapped text columns decoded"""
+        frame = self.combined_df
+        if self.text_tables:
+            frame = frame.assign(**{column: table.take(range(len(table))) for column, table in self.text_tables.items()})
+        return frame[FRAME_COLUMNS]
+
+    def append_rows(self, rows):
+        """Append prepared rows; every attribute they touch is swapped in at once"""
+        start = len(self.combined_df)
+        added = np.arange(start, start + len(rows))
+        frame = compact_frame(pd.concat([self.live_frame(), rows[FRAME_COLUMNS]], ignore_index=True))
+        token_fields = {field: self.token_fields[field].appended(tokens)
+                        for field, tokens in split_fields(rows).items()}
+        removed = np.concatenate([self.removed, np.zeros(len(rows), dtype=bool)])
+        features = self.vectorizer.transform(rows['combined_features']).astype(self.tfidf_matrix.dtype)
+        tfidf = vstack([self.tfidf_matrix, features], format='csr')
+
+        n = tfidf.shape[0]
+        k = max(0, min(self.neighbor_k, n - 1))
+        table = self.neighbors
+        counts = np.diff(table.indptr)
+        # Score of each existing list's k-th entry: a new movie must beat it to get in
+        kth = np.full(table.shape[0], -np.inf, dtype=np.float32)
+        full = counts >= k
+        kth[full] = table.data[table.indptr[1:][full] - 1] if k > 0 else np.inf
+        updates, candidates = {}, {}
+        for begin in range(0, len(rows), NEIGHBOR_BLOCK):
+            block = added[begin:begin + NEIGHBOR_BLOCK]
+            scores = np.asarray(tfidf @ features[begin:begin + NEIGHBOR_BLOCK].T.toarray(), dtype=np.float32)
+            scores[removed] = -np.inf
+            scores[block, np.arange(len(block))] = -np.inf
+            for j, row in enumerate(block):
+                top = top_k(scores[:, j], k)
+                top = top[np.isfinite(scores[top, j])]
+                updates[row] = (top, scores[top, j])
+            for row, j in zip(*np.nonzero(scores[:start] > kth[:, None])):
+                candidates.setdefault(row, []).append((block[j], scores[row, j]))
+        for row, found in candidates.items():
+            ids = np.concatenate([table.indices[table.indptr[row]:table.indptr[row + 1]], [i for i, _ in found]])
+            vals = np.concatenate([table.data[table.indptr[row]:table.indptr[row + 1]], [v for _, v in found]])
+            top = top_k(vals, k)
+            updates[row] = (ids[top], vals[top])
+
+        state = {
+            'combined_df': frame,
+            'token_fields': token_fields,
+            'text_tables': {},
+            'display_entries': frame['display'].to_numpy(dtype=object),
+            'removed': removed,
+            'tfidf_matrix': tfidf,
+            'neighbors': replace_rows(table, n, updates),
+            'ann': None if self.ann is None else self.ann.added(features),
+            'titles': self.titles.updated(dict(zip(added.tolist(), rows['title'])), {},
+                                          frame['popularity'].to_numpy()),
+            'text_delta_start': self.text_delta_start if self.text_delta is not None else start,
+            'sources': None,
+            'generation': uuid.uuid4().hex[:16],
+        }
+        delta_start = state['text_delta_start']
+        state['text_delta'] = TextIndex.from_frame(search_frame(frame, token_fields, delta_start), base=self.text_index)
+        state.update(self.index_state(frame, removed, field_tokens(rows), start))
+        self.__dict__.update(state)
+        return added
+
+    def remove_rows(self, rows):
+        """Tombstone rows: drop them from the indexes and refill the lists that held them"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return
+        removed = self.removed.copy()
+        removed[rows] = True
+        table = self.neighbors
+        entry_rows = np.repeat(np.arange(table.shape[0]), np.diff(table.indptr))
+        dirty = np.unique(entry_rows[np.isin(table.indices, rows)])
+        dirty = dirty[~removed[dirty]]
+        empty = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+        updates = {row: empty for row in rows.tolist()}
+        updates.update(zip(dirty.tolist(), self.fresh_neighbors(dirty, removed)))
+
+        frame = self.combined_df
+        state = {
+            'removed': removed,
+            'removed_count': int(removed.sum()),
+            'neighbors': replace_rows(table, table.shape[0], updates),
+            'titles': self.titles.updated({}, dict(zip(rows.tolist(), frame['title'].iloc[rows])),
+                                          frame['popularity'].to_numpy()),
+            'sources': None,
+            'generation': uuid.uuid4().hex[:16],
+        }
+        state.update(self.index_state(frame, removed, {}, len(frame)))
+        self.__dict__.update(state)
+
+    def index_state(self, frame, removed, tokens, start):
+        """Field indexes and charts after rows with these field tokens were appended at start (or movies removed)"""
+        order = rank_order(frame)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order), dtype=order.dtype)
+        state = self.chart_state(frame, removed)
+        state['rank_order'] = order
+        state.update(self.date_state(frame, removed, order))
+        state['field_indexes'] = {
+            field: index.updated(self.rank_order, rank, tokens.get(field, ()), start, removed)
+            for field, index in self.field_indexes.items()
+        }
+        return state
+
+    def refit(self):
+        """Refit TF-IDF and rebuild every index from the current catalog, then swap it in.
+
+        The rebuild runs without holding the update lock, so serving and
+        updates carry on meanwhile; updates made during the rebuild are
+        replayed onto the new model before its state replaces this one's
+        in a single step. Row ids do not change.
+        """
+        with self.update_lock:
+            frame = expand_frame(self.live_frame(), self.token_fields)
+            removed, mark = self.removed.copy(), len(self.changes)
+        fresh = self.from_frame(frame, removed, self.neighbor_k, self.engine,
+                                hashing=isinstance(self.vectorizer, HashedTfidfVectorizer))
+        if self.ann is not None:
+            fresh.ann.n_probe, fresh.ann.rerank = self.ann.n_probe, self.ann.rerank
+        with self.update_lock:
+            for change in self.changes[mark:]:
+                fresh.apply_change(*change)
+            fresh.update_lock = self.update_lock
+            fresh.result_cache = self.result_cache
+            fresh.changes = []
+            self.__dict__.update(fresh.__dict__)
+
+    def schedule_refit(self, interval):
+        """Refit in a daemon thread every interval seconds while updates are pending.
+
+        Returns an Event; set it to stop the schedule.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                if self.changes:
+                    try:
+                        self.refit()
+                    except Exception:
+                        logger.exception("Scheduled model refit failed")
+
+        threading.Thread(target=run, name='model-refit', daemon=True).start()
+        return stop
+
     def preprocess_data(self):
-        """Preprocess and merge datasets"""
-        # Basic cleaning
-        self.movies_df = self.movies_df.dropna(subset=['overview', 'genres'])
+        """Merge the parsed movies and credits and build the feature text"""
+        # Rows without overview/genres were dropped and the JSON columns
+        # (genres, keywords, cast, crew) parsed by ingest while reading
         self.movies_df = self.movies_df.reset_index(drop=True)
         
-        def safe_literal_eval(x):
-            try:
-                return ast.literal_eval(x)
-            except:
-                return []
-        
-        # Extract genres and keywords
-        self.movies_df['genres_list'] = self.movies_df['genres'].apply(safe_literal_eval)
-        self.movies_df['genres_clean'] = self.movies_df['genres_list'].apply(
-            lambda x: ' '.join([genre['name'].lower() for genre in x]) if isinstance(x, list) else ''
-        )
-        
-        self.movies_df['keywords_list'] = self.movies_df['keywords'].apply(safe_literal_eval)
-        self.movies_df['keywords_clean'] = self.movies_df['keywords_list'].apply(
-            lambda x: ' '.join([keyword['name'].lower().replace(' ', '') for keyword in x]) if isinstance(x, list) else ''
-        )
-        
-        # Process credits
-        self.credits_df['cast_list'] = self.credits_df['cast'].apply(safe_literal_eval)
-        self.credits_df['crew_list'] = self.credits_df['crew'].apply(safe_literal_eval)
-        
-        def get_top_cast(cast_list):
-            if isinstance(cast_list, list):
-                return ' '.join([person['name'].lower().replace(' ', '') for person in cast_list[:3]])
-            return ''
-        
-        def get_director(crew_list):
-            if isinstance(crew_list, list):
-                for person in crew_list:
-                    if person['job'] == 'Director':
-                        return person['name'].lower().replace(' ', '')
-            return ''
-        
-        self.credits_df['top_cast'] = self.credits_df['cast_list'].apply(get_top_cast)
-        self.credits_df['director'] = self.credits_df['crew_list'].apply(get_director)
-        
         # Merge datasets
         self.combined_df = self.movies_df.merge(
             self.credits_df[['movie_id', 'top_cast', 'director']], 
@@ -69,61 +613,429 @@ class MovieRecommender:
         )
         
         # Create features for similarity
-        self.combined_df['combined_features'] = (
-            self.combined_df['overview'].fillna('') + ' ' +
-            self.combined_df['genres_clean'] + ' ' +
-            self.combined_df['keywords_clean'] + ' ' +
-            self.combined_df['top_cast'].fillna('') + ' ' +
-            self.combined_df['director'].fillna('')
-        )
+        self.combined_df['combined_features'] = feature_text(self.combined_df)
+
+    def stream_features(self, movies_path, credits_path, chunksize):
+        """Build the frame and TF-IDF matrix with memory bounded by the chunk size.
+
+        Credits are reduced to top cast and director chunk by chunk. Movies
+        are then streamed: each chunk's feature text is hashed into term
+        counts and discarded, and only the serving columns are kept.
+        """
+        credits = ingest.load_credits(credits_path, chunksize)
+        self.vectorizer = HashedTfidfVectorizer(**TFIDF_PARAMS)
+        frames, counts = [], []
+        for chunk in ingest.timed_chunks(pd.read_csv(movies_path, chunksize=chunksize, usecols=ingest.MOVIE_COLUMNS)):
+            with metrics.load_phase('parse'):
+                chunk = ingest.process_movies_chunk(chunk)
+            with metrics.load_phase('merge'):
+                chunk = chunk.merge(credits, left_on='id', right_on='movie_id', how='left')
+            with metrics.load_phase('tfidf_fit'):
+                counts.append(self.vectorizer.partial_fit(feature_text(chunk)))
+            with metrics.load_phase('display'):
+                chunk['display'] = render_display(chunk)
+            frames.append(chunk[SERVING_COLUMNS])
+        self.combined_df = pd.concat(frames, ignore_index=True)
+        with metrics.load_phase('tfidf_fit'):
+            self.tfidf_matrix = self.vectorizer.finalize(counts)
     
+    def compact(self):
+        """Keep only the frame columns, in compact dtypes, and the multi-valued fields as TokenLists"""
+        self.memory_before = column_memory(self.combined_df)
+        self.token_fields = {
+            field: TokenLists.from_token_lists(tokens) for field, tokens in split_fields(self.combined_df).items()
+        }
+        self.combined_df = compact_frame(self.combined_df)
+        self.movies_df = None
+        self.credits_df = None
+
+    def memory_report(self):
+        """Bytes per column before and after compaction, largest first.
+
+        'before' is the frame compact() was given (all parsed CSV columns
+        for a model built from CSVs); a model loaded from an artifact uses
+        the serving columns in text form instead.
+        """
+        before = self.memory_before
+        if before is None:
+            before = column_memory(expand_frame(self.live_frame(), self.token_fields))
+        after = column_memory(self.combined_df, self.token_fields, self.text_tables)
+        report = pd.DataFrame({'before': before, 'after': after}).fillna(0).astype(np.int64)
+        report = report.sort_values('before', ascending=False)
+        report.loc['total'] = report.sum()
+        return report
+
+    def build_display_text(self):
+        """Pre-render each movie's entry in a chat response list"""
+        self.combined_df['display'] = render_display(self.combined_df)
+
+    def fit_features(self, hashing=False):
+        """Fit TF-IDF features on the combined feature text"""
+        if hashing:
+            self.vectorizer = HashedTfidfVectorizer(**TFIDF_PARAMS)
+            counts = self.vectorizer.partial_fit(self.combined_df['combined_features'])
+            self.tfidf_matrix = self.vectorizer.finalize([counts])
+            return
+        self.vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+        self.tfidf_matrix = self.vectorizer.fit_transform(self.combined_df['combined_features'])
+
     def create_similarity_matrix(self):
-        """Create similarity matrix"""
-        self.vectorizer = TfidfVectorizer(
-            stop_words='english',
-            max_features=5000,
-            ngram_range=(1, 2)
+        """Build the sparse top-k neighbor table and the lookup indexes"""
+        if self.engine == 'ann':
+            self.ann = ann.IVFIndex.build(self.tfidf_matrix)
+            self.neighbors = self.build_ann_neighbor_table(self.neighbor_k)
+        else:
+            self.neighbors = self.build_neighbor_table(self.neighbor_k)
+        self.build_lookup_indexes()
+
+    def build_field_indexes(self):
+        """Build token -> movie posting lists for the filterable fields"""
+        df = self.combined_df
+        self.rank_order = rank_order(df)
+        rank = np.empty_like(self.rank_order)
+        rank[self.rank_order] = np.arange(len(rank), dtype=rank.dtype)
+        self.field_indexes = {
+            field: PostingIndex.from_token_lists(tokens, rank)
+            for field, tokens in field_tokens(df, self.token_fields).items()
+        }
+
+    def build_date_index(self):
+        """Sort the dated movies by release date for range lookups"""
+        self.__dict__.update(self.date_state(self.combined_df, self.removed, self.rank_order))
+
+    @staticmethod
+    def date_state(frame, removed, order):
+        """Date-sorted rows (without removed or undated ones) and every row's rank position"""
+        days = release_days(frame['release_date'])
+        dated = np.flatnonzero((days > 0) & ~removed)
+        date_order = dated[np.argsort(days[dated], kind='stable')].astype(np.int32)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order), dtype=order.dtype)
+        return {'date_order': date_order, 'dates_sorted': days[date_order], 'rank_positions': rank}
+
+    def build_text_index(self):
+        """Build the BM25 full-text index over title, overview and keywords"""
+        self.text_index = TextIndex.from_frame(search_frame(self.combined_df, self.token_fields))
+
+    @metrics.timed('index_lookup')
+    def find_movies(self, field, terms, top_n=10, profile=None):
+        """Row ids of the best rated movies matching any of terms in field.
+
+        Terms are matched as whole tokens (lowercase genre names, cast and
+        director names without spaces, keywords, four-digit years), falling
+        back to substring matches against the field's vocabulary.
+        """
+        positions = self.field_indexes[field].match(terms)
+        return self.personalize(self.rank_order[positions[:self.pool_size(top_n, profile)]], profile, top_n)
+
+    def cached(self, kind, argument, compute):
+        """The bytes compute() returns, through the result cache when there is one.
+
+        Keys hold the model generation, the query kind and its normalized
+        argument, so any update to the catalog starts afresh.
+        """
+        cache = self.result_cache
+        if cache is None:
+            return compute()
+        key = f'{self.generation}:{kind}:{argument}'
+        with metrics.stage('result_cache'):
+            value = cache.get(key)
+        if value is not None:
+            metrics.RESULT_CACHE_LOOKUPS.inc(kind, 'hit')
+            return value
+        metrics.RESULT_CACHE_LOOKUPS.inc(kind, 'miss')
+        value = compute()
+        with metrics.stage('result_cache'):
+            cache.put(key, value)
+        return value
+
+    @metrics.timed('index_lookup')
+    def find_movies_released(self, first_year, last_year, top_n=10, profile=None):
+        """Row ids of the best rated movies released from first_year to last_year (inclusive).
+
+        The date range is two binary searches in the date-sorted rows; only
+        that slice is ranked, by taking its smallest rank positions.
+        """
+        start, stop = np.searchsorted(self.dates_sorted, [first_year * 10000, (last_year + 1) * 10000])
+        positions = self.rank_positions[self.date_order[start:stop]]
+        n = self.pool_size(top_n, profile)
+        if len(positions) > n:
+            positions = np.partition(positions, n - 1)[:n]
+        return self.personalize(self.rank_order[np.sort(positions)], profile, top_n)
+
+    def plan_filters(self, constraints):
+        """(field, token ids, postings) per constraint, cheapest first"""
+        plan = []
+        for field, terms in constraints.items():
+            index = self.field_indexes[field]
+            ids = index.term_ids(terms)
+            plan.append((field, ids, index.count(ids)))
+        return sorted(plan, key=lambda step: step[2])
+
+    @metrics.timed('index_lookup')
+    def find_movies_matching(self, constraints, top_n=10, profile=None):
+        """Row ids of the best rated movies matching every constraint.
+
+        ``constraints`` maps a field to terms, any of which may match (as
+        in find_movies). Only the most selective field's postings are read
+        in full; the survivors are then checked against each other field,
+        cheapest first, stopping as soon as none are left. Positions stay
+        in rank order throughout, so the top n are simply the first n.
+        """
+        plan = self.plan_filters(constraints)
+        if not plan or plan[0][2] == 0:
+            return self.rank_order[:0]
+        field, ids, _ = plan[0]
+        positions = union(self.field_indexes[field].postings_of(ids))
+        for field, ids, _ in plan[1:]:
+            positions = self.field_indexes[field].filter(positions, ids)
+            if len(positions) == 0:
+                break
+        return self.personalize(self.rank_order[positions[:self.pool_size(top_n, profile)]], profile, top_n)
+
+    def profile_vector(self, rows):
+        """Unit-length sum of the TF-IDF rows of a session's movies (None if there are none).
+
+        Dense over the vocabulary, summed straight from the CSR arrays so
+        no sparse matrix is sliced per request.
+        """
+        matrix = self.tfidf_matrix
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[(rows >= 0) & (rows < matrix.shape[0])]
+        rows = rows[~self.removed[rows]]
+        _, entries = row_entries(matrix, rows)
+        profile = np.bincount(matrix.indices[entries], weights=matrix.data[entries], minlength=matrix.shape[1])
+        norm = np.sqrt(profile @ profile)
+        return (profile / norm).astype(np.float32) if norm > 0 else None
+
+    @staticmethod
+    def pool_size(top_n, profile):
+        return top_n if profile is None else top_n * PROFILE_POOL
+
+    def personalize(self, ids, profile, top_n):
+        """The top_n of candidate rows ``ids`` (best first) re-ranked toward a profile.
+
+        Each candidate's cosine similarity to the profile, scaled to the
+        best candidate's, is blended with a score falling linearly with its
+        original position, so the chart order still breaks ties and decides
+        among movies unlike anything the session has seen.
+        """
+        if profile is None or len(ids) == 0:
+            return ids[:top_n]
+        with metrics.stage('personalize'):
+            owners, entries = row_entries(self.tfidf_matrix, ids)
+            weights = self.tfidf_matrix.data[entries] * profile[self.tfidf_matrix.indices[entries]]
+            affinity = np.bincount(owners, weights=weights, minlength=len(ids))
+            best = affinity.max()
+            if best > 0:
+                affinity /= best
+            order = 1 - np.arange(len(ids)) / len(ids)
+            return ids[top_k((1 - PROFILE_BLEND) * order + PROFILE_BLEND * affinity, top_n)]
+
+    def build_lookup_indexes(self):
+        """Build the title resolver and the fixed chart rankings"""
+        self.titles = TitleResolver(
+            self.combined_df['title'].astype(object).tolist(),
+            self.combined_df['popularity'].to_numpy()
         )
-        
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.combined_df['combined_features'])
-        self.cosine_sim = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
-        
-        self.indices = pd.Series(
-            self.combined_df.index, 
-            index=self.combined_df['title']
-        ).drop_duplicates()
+        self.__dict__.update(self.chart_state(self.combined_df, self.removed))
+        if 'display' in self.text_tables:
+            self.display_entries = self.text_tables['display']
+        else:
+            self.display_entries = self.combined_df['display'].to_numpy(dtype=object)
+
+    @staticmethod
+    def chart_state(df, removed):
+        """Chart rankings and the popularity prior, without removed movies"""
+        popular_order = order_by(df, 'popularity')
+        rating_order = order_by(df, 'vote_average')
+        popularity = np.log1p(df['popularity'].fillna(0).clip(lower=0).to_numpy(dtype=np.float64))
+        return {
+            'popular_order': popular_order[~removed[popular_order]],
+            'rating_order': rating_order[~removed[rating_order]],
+            'popularity_prior': (popularity / (popularity.max() or 1.0)).astype(np.float32),
+        }
     
+    def build_neighbor_table(self, k):
+        """Keep the k most similar movies per row as a float32 CSR table.
+
+        TF-IDF rows are L2-normalized, so a sparse dot product is the cosine
+        similarity. Rows are scored block by block and only the top k survive,
+        so memory grows with N * k instead of N * N. Each row's entries are
+        stored in descending score order.
+        """
+        matrix = self.tfidf_matrix.tocsr()
+        n = matrix.shape[0]
+        k = max(0, min(k, n - 1))
+
+        cols = np.empty((n, k), dtype=np.int32)
+        vals = np.empty((n, k), dtype=np.float32)
+        if k > 0:
+            for start in range(0, n, NEIGHBOR_BLOCK):
+                stop = min(start + NEIGHBOR_BLOCK, n)
+                # sparse x dense is much faster than sparse x sparse here, and
+                # the scratch is one dense (block x N) array either way
+                queries = matrix[start:stop].T.toarray()
+                block = np.ascontiguousarray((matrix @ queries).T, dtype=np.float32)
+                rows = np.arange(stop - start)
+                block[rows, rows + start] = -np.inf  # never recommend the movie itself
+                if self.removed_count:
+                    block[:, self.removed] = -np.inf
+
+                top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                top_vals = np.take_along_axis(block, top, axis=1)
+                order = np.lexsort((top, -top_vals), axis=1)
+                cols[start:stop] = np.take_along_axis(top, order, axis=1)
+                vals[start:stop] = np.take_along_axis(top_vals, order, axis=1)
+
+        indptr = np.arange(0, n * k + 1, k, dtype=np.int64) if k > 0 else np.zeros(n + 1, dtype=np.int64)
+        return csr_matrix((vals.ravel(), cols.ravel(), indptr), shape=(n, n))
+
+    def build_ann_neighbor_table(self, k):
+        """The neighbor table from the ANN index: approximate candidates, exact top k.
+
+        Rows may hold fewer than k entries when the probed lists are small.
+        """
+        n = self.tfidf_matrix.shape[0]
+        k = max(0, min(k, n - 1))
+        rows = np.arange(n)
+        cols, vals, counts = [], [], np.zeros(n, dtype=np.int64)
+        if k > 0:
+            for start in range(0, n, NEIGHBOR_BLOCK):
+                block = rows[start:start + NEIGHBOR_BLOCK]
+                for row, (ids, scores) in zip(block, self.ann_neighbors(block, k)):
+                    cols.append(ids)
+                    vals.append(scores)
+                    counts[row] = len(ids)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        cols = np.concatenate(cols).astype(np.int32) if cols else np.zeros(0, dtype=np.int32)
+        vals = np.concatenate(vals).astype(np.float32) if vals else np.zeros(0, dtype=np.float32)
+        return csr_matrix((vals, cols, indptr), shape=(n, n))
+
+    def ann_neighbors(self, rows, top_n, removed=None):
+        """(ids, exact scores) of the top_n neighbors of each row, from ANN candidates"""
+        removed = self.removed if removed is None else removed
+        rows = np.asarray(rows, dtype=np.int64)
+        queries = self.ann.vectors[self.ann.positions[rows]]
+        candidates = self.ann.search_many(queries, top_n * self.ann.rerank, exclude=rows)
+        candidates = [found[~removed[found]] for found in candidates]
+        return ann.rerank(self.tfidf_matrix, rows, candidates, top_n)
+
+    def fresh_neighbors(self, rows, removed):
+        """Recomputed (ids, scores) neighbor lists for rows, skipping removed movies"""
+        k = max(0, min(self.neighbor_k, self.tfidf_matrix.shape[0] - 1))
+        if self.ann is not None:
+            return self.ann_neighbors(rows, k, removed)
+        results = []
+        for start in range(0, len(rows), NEIGHBOR_BLOCK):
+            block_rows = rows[start:start + NEIGHBOR_BLOCK]
+            queries = self.tfidf_matrix[block_rows].T.toarray()
+            scores = np.ascontiguousarray((self.tfidf_matrix @ queries).T, dtype=np.float32)
+            scores[:, removed] = -np.inf
+            scores[np.arange(len(block_rows)), block_rows] = -np.inf
+            for row_scores in scores:
+                top = top_k(row_scores, k)
+                top = top[np.isfinite(row_scores[top])]
+                results.append((top, row_scores[top]))
+        return results
+
+    @metrics.timed('rows')
+    def movie_rows(self, ids):
+        """Display columns for the given row ids, in that order"""
+        rows = self.combined_df.iloc[ids]
+        if not self.text_tables:
+            return rows[DISPLAY_COLUMNS]
+        rows = rows[[c for c in DISPLAY_COLUMNS if c not in self.text_tables]].copy()
+        for column, table in self.text_tables.items():
+            rows[column] = table.take(np.asarray(ids))
+        return rows[DISPLAY_COLUMNS]
+
+    def display_text(self, ids):
+        """Pre-rendered response entries for the given row ids"""
+        entries = self.display_entries
+        return [entries[i] for i in ids]
+
+    def text_contains(self, column, text):
+        """Rows whose text column contains ``text`` (case-insensitive)"""
+        if column in self.text_tables:
+            return self.text_tables[column].contains(text)
+        return self.combined_df[column].str.lower().str.contains(text.lower(), na=False, regex=False).to_numpy()
+
+    def similarity_scores(self, idx):
+        """Cosine similarity of one movie against the whole catalog"""
+        row = self.tfidf_matrix[idx].toarray().ravel()
+        return self.tfidf_matrix @ row
+
+    @metrics.timed('similarity')
+    def similar_ids(self, idx, top_n=10):
+        """Row ids of the top_n movies most similar to row idx"""
+        if top_n <= self.neighbor_k:
+            start = self.neighbors.indptr[idx]
+            stop = min(start + top_n, self.neighbors.indptr[idx + 1])
+            return self.neighbors.indices[start:stop]
+        # Deeper than the precomputed table: score this row on demand
+        if self.ann is not None:
+            return self.ann_neighbors([idx], top_n)[0][0]
+        sim_scores = self.similarity_scores(idx)
+        sim_scores[idx] = -np.inf  # exclude the movie itself by id
+        if self.removed_count:
+            sim_scores[self.removed] = -np.inf
+            return top_k(sim_scores, min(top_n, len(sim_scores) - self.removed_count - 1))
+        return top_k(sim_scores, top_n)
+
+    def similar_ids_many(self, ids, top_n=10):
+        """similar_ids for several rows, scored with one sparse matrix product"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if top_n <= self.neighbor_k or len(ids) == 0:
+            return [self.similar_ids(idx, top_n) for idx in ids]
+        with metrics.stage('similarity'):
+            if self.ann is not None:
+                return [found for found, _ in self.ann_neighbors(ids, top_n)]
+            queries = self.tfidf_matrix[ids].T.toarray()
+            scores = np.ascontiguousarray((self.tfidf_matrix @ queries).T)
+            scores[np.arange(len(ids)), ids] = -np.inf
+            if self.removed_count:
+                scores[:, self.removed] = -np.inf
+                top_n = min(top_n, scores.shape[1] - self.removed_count - 1)
+            return [top_k(row, top_n) for row in scores]
+
     def get_recommendations(self, title, top_n=10):
         """Get recommendations based on movie title"""
-        try:
-            idx = self.indices[title]
-            sim_scores = list(enumerate(self.cosine_sim[idx]))
-            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-            sim_scores = sim_scores[1:top_n+1]
-            movie_indices = [i[0] for i in sim_scores]
-            
-            return self.combined_df.iloc[movie_indices][[
-                'title', 'genres', 'vote_average', 'release_date', 'overview'
-            ]]
-            
-        except KeyError:
-            return f"Movie '{title}' not found. Please check the spelling."
+        with metrics.stage('resolve_title'):
+            idx = self.titles.resolve(title)
+        if idx is None:
+            return NOT_FOUND.format(title=title)
+        return self.movie_rows(self.similar_ids(idx, top_n))
+
+    def similar_ids_for_titles(self, titles, top_n=10):
+        """similar_ids for a batch of titles, in input order (None if not found)"""
+        with metrics.stage('resolve_title'):
+            found = [(i, self.titles.resolve(title)) for i, title in enumerate(titles)]
+        found = [(i, idx) for i, idx in found if idx is not None]
+        results = [None] * len(titles)
+        similar = self.similar_ids_many([idx for _, idx in found], top_n)
+        for (i, _), ids in zip(found, similar):
+            results[i] = ids
+        return results
+
+    def get_recommendations_many(self, titles, top_n=10):
+        """get_recommendations for a batch of titles, in input order"""
+        return [
+            NOT_FOUND.format(title=title) if ids is None else self.movie_rows(ids)
+            for title, ids in zip(titles, self.similar_ids_for_titles(titles, top_n))
+        ]
     
-    def recommend_by_genre(self, genre, top_n=10):
+    def recommend_by_genre(self, genre, top_n=10, profile=None):
         """Recommend by genre"""
-        genre_lower = genre.lower()
-        genre_movies = self.combined_df[
-            self.combined_df['genres_clean'].str.contains(genre_lower, na=False)
-        ]
+        genre_movies = self.find_movies('genres', [genre.lower()], top_n, profile)
         
         if len(genre_movies) == 0:
             return f"No {genre} movies found."
         
-        return genre_movies.nlargest(top_n, ['vote_average', 'popularity'])[[
-            'title', 'genres', 'vote_average', 'release_date', 'overview'
-        ]]
+        return self.movie_rows(genre_movies)
     
-    def recommend_by_mood(self, mood, top_n=10):
+    def recommend_by_mood(self, mood, top_n=10, profile=None):
         """Recommend by mood"""
         mood_genres = {
             'sad': ['Comedy', 'Animation', 'Family'],
@@ -139,40 +1051,72 @@ class MovieRecommender:
         }
         
         target_genres = mood_genres.get(mood, ['Comedy'])
-        mood_movies = self.combined_df[
-            self.combined_df['genres_clean'].str.contains('|'.join([g.lower() for g in target_genres]), na=False)
-        ]
+        mood_movies = self.find_movies('genres', [g.lower() for g in target_genres], top_n, profile)
         
         if len(mood_movies) == 0:
             return f"No movies found for {mood} mood."
         
-        return mood_movies.nlargest(top_n, ['vote_average', 'popularity'])[[
-            'title', 'genres', 'vote_average', 'release_date', 'overview'
-        ]]
+        return self.movie_rows(mood_movies)
     
-    def get_popular_movies(self, top_n=10):
+    def get_popular_movies(self, top_n=10, profile=None):
         """Get popular movies"""
-        return self.combined_df.nlargest(top_n, 'popularity')[[
-            'title', 'genres', 'vote_average', 'release_date', 'overview'
-        ]]
+        ids = self.popular_order[:self.pool_size(top_n, profile)]
+        return self.movie_rows(self.personalize(ids, profile, top_n))
+
+    def get_top_rated_movies(self, top_n=10, profile=None):
+        """Get the highest rated movies"""
+        ids = self.rating_order[:self.pool_size(top_n, profile)]
+        return self.movie_rows(self.personalize(ids, profile, top_n))
     
+    def recommend_by_description(self, text, top_n=10, popularity_weight=POPULARITY_BLEND):
+        """Movies whose TF-IDF features best match free text, nudged toward popular ones.
+
+        The text goes through the fitted vectorizer and is scored against
+        every movie with one sparse matrix-vector product. Only movies that
+        share a term with the text are ranked; cosine scores are scaled to
+        the best match and blended with the popularity prior.
+        """
+        with metrics.stage('describe'):
+            query = self.vectorizer.transform([text])
+            if query.nnz == 0:
+                return self.movie_rows([])
+            scores = self.tfidf_matrix @ query.toarray().ravel()
+            if self.removed_count:
+                scores[self.removed] = 0
+            best = scores.max()
+            if best <= 0:
+                return self.movie_rows([])
+            ranked = (1 - popularity_weight) * (scores / best) + popularity_weight * self.popularity_prior
+            ranked[scores <= 0] = -np.inf
+            ids = top_k(ranked, min(top_n, int(np.count_nonzero(scores > 0))))
+        return self.movie_rows(ids)
+    
+    def text_search(self, query, top_n):
+        """BM25 search over the indexed catalog and any movies added since, minus removed ones"""
+        if self.text_delta is None and not self.removed_count:
+            return self.text_index.search(query, top_n)
+        depth = top_n + self.removed_count
+        docs, scores = self.text_index.search_scored(query, depth)
+        if self.text_delta is not None:
+            delta_docs, delta_scores = self.text_delta.search_scored(query, depth)
+            docs = np.concatenate([docs, delta_docs + self.text_delta_start])
+            scores = np.concatenate([scores, delta_scores])
+        keep = ~self.removed[docs]
+        docs, scores = docs[keep], scores[keep]
+        return docs[np.lexsort((docs, -scores))[:top_n]]
+
     def search_movies(self, query, top_n=5):
-        """Search movies"""
-        query_lower = query.lower()
-        
-        title_matches = self.combined_df[
-            self.combined_df['title'].str.lower().str.contains(query_lower, na=False)
-        ]
-        
-        overview_matches = self.combined_df[
-            self.combined_df['overview'].str.lower().str.contains(query_lower, na=False)
-        ]
-        
-        all_matches = pd.concat([title_matches, overview_matches]).drop_duplicates()
+        """Search titles, overviews and keywords, ranked by BM25.
+
+        Supports ``prefix*`` terms and ``"quoted phrases"``; see fulltext.
+        """
+        normalized = ' '.join(query.lower().split())
+        with metrics.stage('search'):
+            found = self.cached('search', f'{normalized}:{top_n}',
+                                lambda: np.asarray(self.text_search(query, top_n), dtype=np.int32).tobytes())
+            ids = np.frombuffer(found, dtype=np.int32)
         
-        if len(all_matches) == 0:
+        if len(ids) == 0:
             return f"No movies found for '{query}'."
         
-        return all_matches.nlargest(top_n, ['vote_average', 'popularity'])[[
-            'title', 'genres', 'vote_average', 'release_date', 'overview'
-        ]]
\ No newline at end of file
+        return self.movie_rows(ids)
\ No newline at end of file
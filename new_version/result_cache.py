@@ -0,0 +1,156 @@
+"""Cache of computed results for the open-ended queries.
+
+Similar-movie, person, year and search lookups repeat across users, so
+their results are cached under a key of the normalized, resolved
+arguments (see MovieRecommender.cached). Values are bytes: the formatted
+movie list for similar/person/year answers (CompleteMovieExpert.movie_list),
+so a hit skips building the rows, and the int32 row ids for search.
+Two backends share one interface (``get``, ``put``,
+``clear``, ``stats``):
+
+* MemoryResultCache keeps results in the worker process, evicting the
+  least recently used ones past an entry and a byte cap.
+* SqliteResultCache keeps them in a local SQLite file, so a result
+  computed by one gunicorn worker is a hit in every other worker on the
+  host.
+
+Choose one with ``open_cache('memory')``, ``open_cache('sqlite:path.db')``
+or ``open_cache('none')`` (the app reads the RESULT_CACHE environment
+variable).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sessions import Transaction
+
+MAX_ENTRIES = 50000
+MAX_BYTES = 16 << 20
+
+
+class MemoryResultCache:
+    """Results in an OrderedDict kept in least-recently-used order"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.results = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.results.get(key)
+            if value is not None:
+                self.results.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            old = self.results.pop(key, None)
+            if old is not None:
+                self.size -= len(key) + len(old)
+            self.results[key] = value
+            self.size += len(key) + len(value)
+            while len(self.results) > 1 and (len(self.results) > self.max_entries or self.size > self.max_bytes):
+                evicted, value = self.results.popitem(last=False)
+                self.size -= len(evicted) + len(value)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.results = OrderedDict()
+            self.size = 0
+
+    def stats(self):
+        return {'entries': len(self.results), 'bytes': self.size, 'evictions': self.evictions}
+
+
+class SqliteResultCache:
+    """Results in a SQLite file shared by the worker processes on a host.
+
+    Reads run outside any transaction. A hit only rewrites its last-used
+    time once that is TOUCH_AFTER seconds old, so hot keys do not turn
+    every read into a write. The caps are enforced every EVICT_EVERY puts
+    (by this process), so they are approximate in between.
+    """
+
+    TOUCH_AFTER = 1.0
+    EVICT_EVERY = 64
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.local = threading.local()
+        self.puts = 0
+        self.evictions = 0
+        with self.connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS results ('
+                       'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+
+    def database(self):
+        db = getattr(self.local, 'db', None)
+        if db is None or self.local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.local.db, self.local.pid = db, os.getpid()
+        return db
+
+    def connect(self):
+        return Transaction(self.database())
+
+    def get(self, key):
+        db = self.database()
+        row = db.execute('SELECT value, last_used FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = self.clock()
+        if now - row[1] > self.TOUCH_AFTER:
+            db.execute('UPDATE results SET last_used = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def put(self, key, value):
+        self.database().execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                                (key, value, len(key) + len(value), self.clock()))
+        self.puts += 1
+        if self.puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Delete the least recently used results past either cap"""
+        with self.connect() as db:
+            entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+            excess = entries - self.max_entries
+            if size > self.max_bytes:
+                # Drop the average share of entries holding the excess bytes
+                excess = max(excess, -(-(size - self.max_bytes) * entries // size))
+            if excess > 0:
+                db.execute('DELETE FROM results WHERE key IN '
+                           '(SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,))
+                self.evictions += excess
+
+    def clear(self):
+        with self.connect() as db:
+            db.execute('DELETE FROM results')
+
+    def stats(self):
+        entries, size = self.database().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {'entries': entries, 'bytes': size, 'evictions': self.evictions}
+
+
+def open_cache(spec='memory'):
+    """Result cache for a spec: 'memory', 'sqlite:<path>', or 'none' (no cache)"""
+    if spec == 'none':
+        return None
+    if not spec or spec == 'memory':
+        return MemoryResultCache()
+    if spec.startswith('sqlite:'):
+        return SqliteResultCache(spec[len('sqlite:'):])
+    raise ValueError(f"Unknown result cache '{spec}'; use 'memory', 'sqlite:<path>' or 'none'")
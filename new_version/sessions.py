@@ -0,0 +1,273 @@
+"""Per-session conversation history for the chat endpoint.
+
+Each session keeps its last HISTORY_SIZE messages in a ring buffer, and
+the row ids of the last PROFILE_SIZE movies it asked about (the movies its
+recommendations are personalized towards). Two backends share one
+interface (``append``, ``history``, ``add_rows``, ``rows``, ``clear``):
+
+* MemorySessionStore keeps sessions in the worker process, evicting the
+  least recently used ones past a global size cap and dropping sessions
+  idle for longer than the TTL.
+* SqliteSessionStore keeps them in a local SQLite file, so every gunicorn
+  worker on the host sees the same conversations.
+
+Choose one with ``open_store('memory')`` or ``open_store('sqlite:path.db')``
+(the app reads the SESSION_STORE environment variable).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+HISTORY_SIZE = 20
+PROFILE_SIZE = 20
+SESSION_TTL = 3600
+# Approximate cap on the text held by the in-process store
+MAX_BYTES = 32 << 20
+# Longer messages are truncated before they are stored
+MAX_MESSAGE = 1000
+
+
+class Session:
+    __slots__ = ('messages', 'rows', 'size', 'last_seen')
+
+    def __init__(self, history_size, profile_size):
+        self.messages = deque(maxlen=history_size)
+        self.rows = deque(maxlen=profile_size)
+        self.size = 0
+        self.last_seen = 0.0
+
+
+class MemorySessionStore:
+    """Sessions in an OrderedDict kept in least-recently-used order"""
+
+    def __init__(self, history_size=HISTORY_SIZE, ttl=SESSION_TTL, max_bytes=MAX_BYTES, clock=time.monotonic,
+                 profile_size=PROFILE_SIZE):
+        self.history_size = history_size
+        self.profile_size = profile_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.sessions = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def append(self, session_id, message):
+        message = message[:MAX_MESSAGE]
+        with self.lock:
+            session = self.touch(session_id)
+            if len(session.messages) == session.messages.maxlen:
+                session.size -= len(session.messages[0])
+                self.size -= len(session.messages[0])
+            session.messages.append(message)
+            session.size += len(message)
+            self.size += len(message)
+            self.evict(keep=session_id)
+
+    def add_rows(self, session_id, rows):
+        with self.lock:
+            self.touch(session_id).rows.extend(int(row) for row in rows)
+
+    def touch(self, session_id):
+        """The live session (created if missing), marked as just used"""
+        now = self.clock()
+        self.expire(now)
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(self.history_size, self.profile_size)
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def history(self, session_id):
+        with self.lock:
+            session = self.live(session_id)
+            return [] if session is None else list(session.messages)
+
+    def rows(self, session_id):
+        with self.lock:
+            session = self.live(session_id)
+            return [] if session is None else list(session.rows)
+
+    def live(self, session_id):
+        """The session if it exists and has not expired (marked as just used)"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        now = self.clock()
+        if now - session.last_seen > self.ttl:
+            self.drop(session_id)
+            return None
+        session.last_seen = now
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def clear(self, session_id):
+        with self.lock:
+            if session_id in self.sessions:
+                self.drop(session_id)
+
+    def drop(self, session_id):
+        self.size -= self.sessions.pop(session_id).size
+
+    def expire(self, now):
+        """Drop idle sessions; LRU order means they are all at the front"""
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_seen <= self.ttl:
+                break
+            self.drop(session_id)
+
+    def evict(self, keep):
+        while self.size > self.max_bytes and len(self.sessions) > 1:
+            session_id = next(iter(self.sessions))
+            if session_id == keep:
+                break
+            self.drop(session_id)
+            self.evictions += 1
+
+    def stats(self):
+        return {'sessions': len(self.sessions), 'bytes': self.size, 'evictions': self.evictions}
+
+
+class SqliteSessionStore:
+    """Sessions in a SQLite file shared by the worker processes on a host.
+
+    Connections are opened lazily per thread and per process, so a store
+    created before gunicorn forks is still safe to use in the workers.
+    """
+
+    # Expired sessions are purged once every this many appends
+    PURGE_EVERY = 256
+
+    def __init__(self, path, history_size=HISTORY_SIZE, ttl=SESSION_TTL, clock=time.time,
+                 profile_size=PROFILE_SIZE):
+        self.path = path
+        self.history_size = history_size
+        self.profile_size = profile_size
+        self.ttl = ttl
+        self.clock = clock
+        self.local = threading.local()
+        self.appends = 0
+        with self.connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS messages ('
+                       'session_id TEXT NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL, '
+                       'PRIMARY KEY (session_id, seq))')
+            db.execute('CREATE TABLE IF NOT EXISTS sessions ('
+                       'session_id TEXT PRIMARY KEY, last_seen REAL NOT NULL, next_seq INTEGER NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)')
+            # Profile row ids, space separated, oldest first
+            db.execute('CREATE TABLE IF NOT EXISTS profiles (session_id TEXT PRIMARY KEY, rows TEXT NOT NULL)')
+
+    def connect(self):
+        db = getattr(self.local, 'db', None)
+        if db is None or self.local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.local.db, self.local.pid = db, os.getpid()
+        return Transaction(db)
+
+    def append(self, session_id, message):
+        now = self.clock()
+        with self.connect() as db:
+            row = db.execute('SELECT last_seen, next_seq FROM sessions WHERE session_id = ?',
+                             (session_id,)).fetchone()
+            if row is not None and now - row[0] > self.ttl:
+                db.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+                db.execute('DELETE FROM profiles WHERE session_id = ?', (session_id,))
+            seq = row[1] if row is not None else 0
+            db.execute('INSERT INTO messages VALUES (?, ?, ?)', (session_id, seq, message[:MAX_MESSAGE]))
+            # Ring buffer: forget whatever fell out of the last history_size slots
+            db.execute('DELETE FROM messages WHERE session_id = ? AND seq <= ?',
+                       (session_id, seq - self.history_size))
+            db.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)', (session_id, now, seq + 1))
+        self.appends += 1
+        if self.appends % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def history(self, session_id):
+        now = self.clock()
+        with self.connect() as db:
+            row = db.execute('SELECT last_seen FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                return []
+            db.execute('UPDATE sessions SET last_seen = ? WHERE session_id = ?', (now, session_id))
+            rows = db.execute('SELECT message FROM messages WHERE session_id = ? ORDER BY seq',
+                              (session_id,)).fetchall()
+        return [message for message, in rows]
+
+    def add_rows(self, session_id, rows):
+        now = self.clock()
+        with self.connect() as db:
+            row = db.execute('SELECT last_seen FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                db.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+                db.execute('DELETE FROM profiles WHERE session_id = ?', (session_id,))
+                db.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, 0)', (session_id, now))
+            else:
+                db.execute('UPDATE sessions SET last_seen = ? WHERE session_id = ?', (now, session_id))
+            found = db.execute('SELECT rows FROM profiles WHERE session_id = ?', (session_id,)).fetchone()
+            kept = (found[0].split() if found else []) + [str(int(r)) for r in rows]
+            db.execute('INSERT OR REPLACE INTO profiles VALUES (?, ?)',
+                       (session_id, ' '.join(kept[-self.profile_size:])))
+
+    def rows(self, session_id):
+        now = self.clock()
+        with self.connect() as db:
+            row = db.execute('SELECT last_seen FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                return []
+            db.execute('UPDATE sessions SET last_seen = ? WHERE session_id = ?', (now, session_id))
+            found = db.execute('SELECT rows FROM profiles WHERE session_id = ?', (session_id,)).fetchone()
+        return [int(r) for r in found[0].split()] if found else []
+
+    def clear(self, session_id):
+        with self.connect() as db:
+            db.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+            db.execute('DELETE FROM profiles WHERE session_id = ?', (session_id,))
+            db.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def purge(self):
+        """Delete every session idle for longer than the TTL"""
+        cutoff = self.clock() - self.ttl
+        with self.connect() as db:
+            db.execute('DELETE FROM messages WHERE session_id IN '
+                       '(SELECT session_id FROM sessions WHERE last_seen < ?)', (cutoff,))
+            db.execute('DELETE FROM profiles WHERE session_id IN '
+                       '(SELECT session_id FROM sessions WHERE last_seen < ?)', (cutoff,))
+            db.execute('DELETE FROM sessions WHERE last_seen < ?', (cutoff,))
+
+    def stats(self):
+        with self.connect() as db:
+            sessions, = db.execute('SELECT COUNT(*) FROM sessions').fetchone()
+        return {'sessions': sessions}
+
+
+class Transaction:
+    """``with`` block running its statements in one immediate transaction"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+
+
+def open_store(spec='memory'):
+    """Session store for a spec: 'memory' or 'sqlite:<path>'"""
+    if not spec or spec == 'memory':
+        return MemorySessionStore()
+    if spec.startswith('sqlite:'):
+        return SqliteSessionStore(spec[len('sqlite:'):])
+    raise ValueError(f"Unknown session store '{spec}'; use 'memory' or 'sqlite:<path>'")
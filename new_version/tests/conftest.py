@@ -0,0 +1,36 @@
+"""Shared fixtures: a small synthetic catalog (see benchmarks/generate_data.py)."""
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BASE_DIR, os.path.join(BASE_DIR, 'benchmarks')]
+
+from generate_data import generate  # noqa: E402
+from nlp_model import CompleteMovieExpert  # noqa: E402
+from recommender import MovieRecommender  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('tmdb')
+    generate(str(path), 300)
+    return path
+
+
+@pytest.fixture(scope='session')
+def shared_recommender(data_dir):
+    """One model for the tests that only read it"""
+    return MovieRecommender.build(str(data_dir / 'movies.csv'), str(data_dir / 'credits.csv'))
+
+
+@pytest.fixture
+def recommender(data_dir):
+    """A model of its own, for tests that update the catalog"""
+    return MovieRecommender.build(str(data_dir / 'movies.csv'), str(data_dir / 'credits.csv'))
+
+
+@pytest.fixture(scope='session')
+def expert(shared_recommender):
+    return CompleteMovieExpert(shared_recommender)
@@ -0,0 +1,17 @@
+"""CompleteMovieExpert.process_queries, the /chat/batch path."""
+import metrics
+
+
+def test_batch_matches_single_answers(expert):
+    messages = ['action', 'comedy movies from 2005', 'action', 'hello there friend']
+    answers = expert.process_queries(messages)
+    assert answers[0] == answers[2] == expert.process_query('action')
+    assert answers[1] == expert.process_query('comedy movies from 2005')
+
+
+def test_batch_records_chat_latency_per_message(expert, shared_recommender):
+    title = shared_recommender.combined_df['title'].iat[0]
+    metrics.CHAT_SECONDS.reset()
+    expert.process_queries(['action', 'action', f'movies like {title}'])
+    counts = {intent: sum(state[:-1]) for (intent,), state in metrics.CHAT_SECONDS.values.items()}
+    assert counts == {'action_movies': 2, 'similar_movies': 1}
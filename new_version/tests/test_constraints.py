@@ -0,0 +1,31 @@
+"""Filters pulled out of a message by CompleteMovieExpert.extract_constraints."""
+import pytest
+
+NOUN_PHRASES = [
+    ('horror movies with zombies', 'horror_movies', ['horror']),
+    ('sci-fi movies with aliens', 'sci-fi_movies', ['science fiction']),
+    ('family movies with talking animals', 'family_movies', ['family']),
+    ('comedy movies with a happy ending', 'comedy_movies', ['comedy']),
+]
+
+
+@pytest.mark.parametrize('message, intent, genres', NOUN_PHRASES)
+def test_with_a_noun_phrase_is_not_a_person(expert, message, intent, genres):
+    assert expert.extract_constraints(message) == {'genres': genres}
+    assert expert.process_query(message) == expert.handle_genre_request(intent)
+
+
+def test_with_a_known_name_is_a_cast_filter(expert, shared_recommender):
+    token = next(iter(shared_recommender.field_indexes['cast'].token_ids))
+    constraints = expert.extract_constraints(f'comedy movies with {token}')
+    assert constraints == {'genres': ['comedy'], 'cast': [token]}
+
+
+@pytest.mark.parametrize('message, field', [
+    ('comedy movies starring Nobody Known', 'cast'),
+    ('comedy movies featuring Nobody Known', 'cast'),
+    ('comedy movies directed by Nobody Known', 'director'),
+])
+def test_explicit_cue_keeps_an_unknown_name(expert, message, field):
+    assert expert.extract_constraints(message)[field] == ['nobody known']
+    assert expert.process_query(message).startswith("Sorry, I couldn't find any movies with")
@@ -0,0 +1,55 @@
+"""The chunked JSON ingestion against the previous literal_eval preprocessing."""
+import csv
+import json
+
+import pytest
+
+from bench_ingest import current_features, legacy_features
+
+
+def person(name, job=None):
+    entry = {'id': 1, 'name': name, 'credit_id': 'x'}
+    if job:
+        entry['job'] = job
+    return entry
+
+
+CAST = [person(name) for name in ('Ann Lee', 'Bo Park', 'Cy Diaz', 'Di Berg', 'Ed Nolan')]
+CREW = [person('Fay Chen', 'Editor'), person('Gil Rossi', 'Director'), person('Hal Moreau', 'Director')]
+
+# (genres, keywords, cast, crew) cells, each against one movie
+CELLS = [
+    # JSON, with more cast than the three decoded and the director after other crew
+    (json.dumps([{'id': 28, 'name': 'Action'}]), json.dumps([{'id': 1, 'name': 'car chase'}]),
+     json.dumps(CAST), json.dumps(CREW)),
+    # Python-quoted lists, as str(list) writes them
+    (str([{'id': 35, 'name': 'Comedy'}]), str([{'id': 2, 'name': "o'brien"}]), str(CAST), str(CREW)),
+    # Malformed: not a list, cut off inside an entry, cut off after the decoded entries
+    ('action', 'none', json.dumps(CAST)[:40], json.dumps(CREW)[:30]),
+    (json.dumps([{'id': 18, 'name': 'Drama'}]), '[]', json.dumps(CAST)[:-30], json.dumps(CREW)[:-5]),
+    # The job text inside another field, and empty lists
+    (json.dumps([{'id': 18, 'name': 'Drama'}]), '[]', '[]',
+     json.dumps([{'name': 'Ida Tanaka', 'note': '"job": "Director"', 'job': 'Writer'}])),
+    (json.dumps([{'id': 18, 'name': 'Drama'}]), '[]', '', ''),
+]
+
+
+@pytest.fixture(scope='module')
+def paths(tmp_path_factory):
+    path = tmp_path_factory.mktemp('ingest')
+    movies, credits = path / 'movies.csv', path / 'credits.csv'
+    with open(movies, 'w', newline='') as movies_file, open(credits, 'w', newline='') as credits_file:
+        movie_rows, credit_rows = csv.writer(movies_file), csv.writer(credits_file)
+        movie_rows.writerow(['id', 'title', 'genres', 'keywords', 'overview', 'vote_average',
+                             'popularity', 'release_date'])
+        credit_rows.writerow(['movie_id', 'title', 'cast', 'crew'])
+        for i, (genres, keywords, cast, crew) in enumerate(CELLS):
+            movie_rows.writerow([i, f'Movie {i}', genres, keywords, f'Overview {i}.', 6.5, 1.0, '2001-01-01'])
+            credit_rows.writerow([i, f'Movie {i}', cast, crew])
+    return str(movies), str(credits)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_features_match_literal_eval(paths, workers):
+    expected = legacy_features(*paths)
+    assert current_features(*paths, workers).tolist() == expected.tolist()
@@ -0,0 +1,52 @@
+"""Cached answers after add_movies / remove_movies / refit."""
+import json
+
+import metrics
+from nlp_model import CompleteMovieExpert
+
+NEW_MOVIE = {
+    'budget': 0, 'genres': json.dumps([{'id': 28, 'name': 'Action'}]), 'homepage': '', 'id': 999999,
+    'keywords': '[]', 'original_language': 'en', 'original_title': 'Zzyzx Showdown',
+    'overview': 'A test movie.', 'popularity': 1000.0, 'production_companies': '[]',
+    'release_date': '2015-06-01', 'revenue': 0, 'runtime': 100, 'status': 'Released', 'tagline': '',
+    'title': 'Zzyzx Showdown', 'vote_average': 10.0, 'vote_count': 5000,
+}
+
+
+def top_action_id(recommender):
+    row = recommender.recommend_by_genre('action').index[0]
+    return int(recommender.combined_df['id'].iat[row])
+
+
+def test_remove_clears_cached_answers(recommender):
+    expert = CompleteMovieExpert(recommender)
+    before = expert.process_query('action')
+    recommender.remove_movies([top_action_id(recommender)])
+    after = expert.process_query('action')
+    assert after != before
+    assert after == expert.handle_genre_request('action_movies')
+
+
+def test_add_clears_cached_answers(recommender):
+    expert = CompleteMovieExpert(recommender)
+    assert 'Zzyzx Showdown' not in expert.process_query('action')
+    recommender.add_movies([NEW_MOVIE])
+    assert 'Zzyzx Showdown' in expert.process_query('action')
+
+
+def test_refit_clears_cached_answers(recommender):
+    expert = CompleteMovieExpert(recommender)
+    expert.process_query('action')
+    recommender.remove_movies([top_action_id(recommender)])
+    recommender.refit()
+    assert expert.process_query('action') == expert.handle_genre_request('action_movies')
+
+
+def test_response_cache_lookups_are_exported(recommender):
+    expert = CompleteMovieExpert(recommender)
+    metrics.RESPONSE_CACHE_LOOKUPS.reset()
+    expert.process_query('action')
+    recommender.remove_movies([top_action_id(recommender)])
+    expert.process_query('action')
+    assert metrics.RESPONSE_CACHE_LOOKUPS.values == {('action_movies', 'hit'): 1, ('action_movies', 'miss'): 1}
+    assert 'movie_response_cache_lookups_total{query="action_movies",result="hit"} 1' in metrics.render()
@@ -0,0 +1,168 @@
+"""Title resolution for similar-movie lookups.
+
+Titles are normalized (casefolded, punctuation removed, leading article
+dropped) into an exact-match dictionary. Misspelled input is matched
+through a character-trigram index: the titles sharing the most trigrams
+with the query are re-checked with an edit distance under a small budget.
+When several movies share a normalized title, one whose title is exactly
+the query (up to case and spacing) wins, then the most popular one, so
+"The Thing" and "Thing" still resolve to themselves.
+"""
+import copy
+import re
+import unicodedata
+
+import numpy as np
+
+ARTICLES = ('the ', 'a ', 'an ')
+CANDIDATES = 20
+
+
+def normalize_title(title):
+    """Casefold, strip accents and punctuation, drop a leading article"""
+    text = unicodedata.normalize('NFKD', str(title).casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace('&', ' and ')
+    text = ' '.join(re.sub(r'[\W_]+', ' ', text).split())
+    for article in ARTICLES:
+        if text.startswith(article) and len(text) > len(article):
+            return text[len(article):]
+    return text
+
+
+def exact_title(title):
+    """Casefold and collapse whitespace, keeping articles and punctuation"""
+    return ' '.join(str(title).casefold().split())
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def distance_budget(key):
+    """Edits tolerated for a query: none for very short titles, at most 3"""
+    return min(3, len(key) // 4)
+
+
+class TitleResolver:
+    def __init__(self, titles, popularity):
+        popularity = np.nan_to_num(np.asarray(popularity, dtype=np.float64), nan=-np.inf)
+        rows_by_key = {}
+        # Exact title of each row written differently from its key
+        self.exact_titles = {}
+        for row in np.lexsort((np.arange(len(popularity)), -popularity)):
+            key = normalize_title(titles[row])
+            if key:
+                rows_by_key.setdefault(key, []).append(int(row))
+                self.note_exact(int(row), titles[row], key)
+        self.rows_by_key = rows_by_key
+        self.keys = list(rows_by_key)
+        self.key_ids = {key: i for i, key in enumerate(self.keys)}
+        self.key_popularity = [popularity[rows[0]] for rows in rows_by_key.values()]
+
+        postings = {}
+        for key_id, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(key_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def note_exact(self, row, title, key):
+        exact = exact_title(title)
+        if exact != key:
+            self.exact_titles[row] = exact
+
+    def lookup(self, title):
+        """All rows whose normalized title equals title's: exact titles first, then most popular first"""
+        key = normalize_title(title)
+        rows = self.rows_by_key.get(key, [])
+        if len(rows) > 1:
+            exact = exact_title(title)
+            rows = sorted(rows, key=lambda row: self.exact_titles.get(row, key) != exact)
+        return rows
+
+    def fuzzy_keys(self, key, limit):
+        """Normalized titles within ``limit`` edits of key, closest (then most popular) first"""
+        lists = [self.postings[gram] for gram in trigrams(key) if gram in self.postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+        count = min(CANDIDATES, int(np.count_nonzero(shared)))
+        candidates = np.argpartition(-shared, count - 1)[:count]
+        matches = []
+        for key_id in candidates:
+            distance = edit_distance(key, self.keys[key_id], limit)
+            if distance <= limit and self.keys[key_id] in self.rows_by_key:
+                matches.append((distance, -self.key_popularity[key_id], self.keys[key_id]))
+        return [candidate for _, _, candidate in sorted(matches)]
+
+    def updated(self, added, removed, popularity):
+        """A copy with rows added and rows removed (both {row: title}).
+
+        ``popularity`` is indexed by row. Keys whose last row is removed
+        stay in the trigram index but no longer resolve.
+        """
+        popularity = np.nan_to_num(np.asarray(popularity, dtype=np.float64), nan=-np.inf)
+        resolver = copy.copy(self)
+        resolver.rows_by_key = dict(self.rows_by_key)
+        resolver.keys = list(self.keys)
+        resolver.key_ids = dict(self.key_ids)
+        resolver.key_popularity = list(self.key_popularity)
+        resolver.postings = dict(self.postings)
+        resolver.exact_titles = dict(self.exact_titles)
+
+        changed = set()
+        for row, title in removed.items():
+            resolver.exact_titles.pop(row, None)
+            key = normalize_title(title)
+            rows = [r for r in resolver.rows_by_key.get(key, []) if r != row]
+            if rows:
+                resolver.rows_by_key[key] = rows
+                changed.add(key)
+            else:
+                resolver.rows_by_key.pop(key, None)
+        for row, title in added.items():
+            key = normalize_title(title)
+            if not key:
+                continue
+            resolver.note_exact(row, title, key)
+            if key not in resolver.key_ids:
+                key_id = resolver.key_ids[key] = len(resolver.keys)
+                resolver.keys.append(key)
+                resolver.key_popularity.append(popularity[row])
+                for gram in trigrams(key):
+                    resolver.postings[gram] = np.append(resolver.postings.get(gram, []), key_id).astype(np.int32)
+            resolver.rows_by_key[key] = resolver.rows_by_key.get(key, []) + [row]
+            changed.add(key)
+        for key in changed:
+            rows = sorted(resolver.rows_by_key[key], key=lambda r: (-popularity[r], r))
+            resolver.rows_by_key[key] = rows
+            resolver.key_popularity[resolver.key_ids[key]] = popularity[rows[0]]
+        return resolver
+
+    def resolve(self, title):
+        """Best matching row id for a typed title, or None"""
+        rows = self.lookup(title)
+        if rows:
+            return rows[0]
+        key = normalize_title(title)
+        limit = distance_budget(key)
+        if not key or limit == 0:
+            return None
+        matches = self.fuzzy_keys(key, limit)
+        return self.rows_by_key[matches[0]][0] if matches else None